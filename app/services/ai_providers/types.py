@@ -39,7 +39,7 @@ class TokenUsage:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class RerankCandidate:
     """Candidate document to be re-ranked."""
 
@@ -49,7 +49,7 @@ class RerankCandidate:
     score: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RankedDocument:
     """Reranked document including final score and original payload."""
 
@@ -2,6 +2,7 @@ import json
 import logging
 import tempfile
 from contextlib import suppress
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -22,6 +23,27 @@ from app.services.vector_service import VectorService
 import tiktoken
 # from sqlalchemy import text  # no longer used here
 
+
+@lru_cache(maxsize=16)
+def _resolve_encoder(model_candidates: Tuple[str, ...]):
+    """Return the tokenizer for the first known model, falling back to base encodings.
+
+    Cached per candidate tuple so each AIService() skips the failed lookups;
+    errors are not cached, so a transient tiktoken failure is retried next time.
+    """
+    for candidate in model_candidates:
+        try:
+            return tiktoken.encoding_for_model(candidate)
+        except Exception:
+            continue
+    for fallback_name in ('o200k_base', 'cl100k_base'):
+        try:
+            return tiktoken.get_encoding(fallback_name)
+        except Exception:
+            continue
+    raise RuntimeError('Unable to initialize tokenizer encoder')
+
+
 class AIService:
     def __init__(self):
         self.openai = OpenAIProvider()
@@ -66,25 +88,7 @@ class AIService:
             'gpt-5-mini',
             'gpt-5-nano',
         ]
-        for candidate in tokenizer_model_candidates:
-            if not candidate:
-                continue
-            try:
-                self.encoder = tiktoken.encoding_for_model(candidate)
-                break
-            except Exception:
-                continue
-
-        if self.encoder is None:
-            for fallback_name in ('o200k_base', 'cl100k_base'):
-                try:
-                    self.encoder = tiktoken.get_encoding(fallback_name)
-                    break
-                except Exception:
-                    continue
-
-        if self.encoder is None:
-            raise RuntimeError('Unable to initialize tokenizer encoder')
+        self.encoder = _resolve_encoder(tuple(c for c in tokenizer_model_candidates if c))
         # default debug flag (methods accept per-call debug flag)
         self.debug_default = False
 
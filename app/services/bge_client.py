@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import base64
 import logging
 import random
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
 
+import numpy as np
 import requests
 from flask import current_app
 
@@ -37,6 +39,10 @@ class BGEResult:
     colbert_tokens: List[List[List[float]]]
     colbert_agg: List[List[float]]
     meta: Dict[str, object]
+    dense: List[List[float]] = field(default_factory=list)
+
+    def first_dense(self) -> Optional[List[float]]:
+        return self.dense[0] if self.dense else None
 
     def first_sparse(self) -> Optional[BGESparseVector]:
         return self.lexical[0] if self.lexical else None
@@ -48,6 +54,22 @@ class BGEResult:
         return self.colbert_agg[0] if self.colbert_agg else None
 
 
+_DENSE_DTYPES = {"fp16": "<f2", "int8": "<i1"}
+
+
+def decode_dense(encoded: Dict[str, Any]) -> List[List[float]]:
+    """Rebuild float rows from the service's ``dense_encoded`` payload (fp16 or per-row scaled int8)."""
+    try:
+        dtype = _DENSE_DTYPES[encoded["dtype"]]
+        rows, dim = (int(n) for n in encoded["shape"])
+        mat = np.frombuffer(base64.b64decode(encoded["data"]), dtype=dtype).reshape(rows, dim).astype(np.float32)
+        if encoded["dtype"] == "int8":
+            mat *= np.asarray(encoded["scales"], dtype=np.float32)[:, None]
+    except (KeyError, TypeError, ValueError) as exc:
+        raise BGEClientError(f"Invalid dense_encoded payload: {exc}") from exc
+    return mat.tolist()
+
+
 class BGEClient:
     """Thin HTTP client for the local BGE-M3 embedding service."""
 
@@ -101,12 +123,21 @@ class BGEClient:
             value = 0.5
         return max(0.0, value)
 
+    def max_encode_secs(self) -> float:
+        """Worst-case wall time of one encode call: every attempt times out, plus all backoff."""
+        attempts = self._retry_attempts()
+        backoff = self._retry_backoff()
+        jitter = self._retry_jitter()
+        sleeps = sum(backoff * attempt + jitter for attempt in range(1, attempts))
+        return attempts * self._timeout() + sleeps
+
     def encode(
         self,
         sentences: Sequence[str],
         *,
         return_dense: bool = False,
         return_colbert_vecs: bool = True,
+        dense_precision: str = "fp32",
     ) -> BGEResult:
         sentences = [item for item in sentences if (item or "").strip()]
         if not sentences:
@@ -118,6 +149,9 @@ class BGEClient:
             "return_sparse": True,
             "return_colbert_vecs": bool(return_colbert_vecs),
         }
+        if return_dense:
+            # fp16/int8 come back as a compact base64 buffer; decoded in _perform_encode_request
+            payload["dense_precision"] = dense_precision
         attempts = self._retry_attempts()
         base_delay = self._retry_backoff()
         jitter = self._retry_jitter()
@@ -196,11 +230,20 @@ class BGEClient:
         if not isinstance(meta, dict):
             meta = {}
 
+        dense_encoded = data.get("dense_encoded")
+        if isinstance(dense_encoded, dict):
+            dense = decode_dense(dense_encoded)
+        else:
+            dense = data.get("dense") or []
+            if not isinstance(dense, list):
+                dense = []
+
         return BGEResult(
             lexical=lexical,
             colbert_tokens=colbert_tokens,
             colbert_agg=colbert_agg,
             meta=meta,
+            dense=dense,
         )
 
     def close(self) -> None:
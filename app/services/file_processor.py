@@ -1,8 +1,10 @@
+import hashlib
 import logging
 import os
 import threading
 import json
 
+from collections import OrderedDict
 from datetime import datetime
 
 from flask import current_app
@@ -12,13 +14,41 @@ from app.models.ai_usage_log import AIUsageLog
 from app.models.file_processing_log import FileProcessingLog
 from app.models.knowledge_file import KnowledgeFile
 from app.services.ai_service import AIService
-from app.services.bge_client import BGEClient, BGEClientError
-from app.services.vector_service import VectorService
+from app.services.bge_client import BGEClient, BGEClientError, BGESparseVector
+from app.services.vector_service import VectorService, stable_bucket
 from sqlalchemy import text
 
 # Celery removed - processing is now synchronous or handled by external automaton
 celery = None
 
+# Process-wide LRU of BGE ingestion encodings keyed by chunk content hash, so
+# repeated chunks (boilerplate, re-uploads, retries) skip the BGE round-trip.
+_BGE_ENCODE_CACHE: 'OrderedDict[str, tuple]' = OrderedDict()
+_BGE_ENCODE_CACHE_LOCK = threading.Lock()
+_BGE_ENCODE_CACHE_MAX = 2048
+
+# Chunks accumulated per Qdrant upsert during ingestion.
+UPSERT_BATCH_SIZE = 32
+
+
+def _take_upsert_batch(pending: list, final: bool = False) -> list:
+    """Pop the next upsert batch off ``pending`` (empty list when not due yet).
+
+    Mid-loop batches are only taken once more than UPSERT_BATCH_SIZE items are
+    queued and always leave the remainder behind, so the closing ``final`` call
+    has something to send with wait=True even when the chunk count is an exact
+    multiple of the batch size or the loop breaks right after a flush.
+    """
+    if final:
+        count = len(pending)
+    elif len(pending) > UPSERT_BATCH_SIZE:
+        count = UPSERT_BATCH_SIZE
+    else:
+        return []
+    batch = pending[:count]
+    del pending[:count]
+    return batch
+
 # Local exception to signal guarded OCR blocking
 class ProcessingBlocked(Exception):
     pass
@@ -72,6 +102,23 @@ class FileProcessor:
             self._bge_client = BGEClient()
         return self._bge_client
 
+    def encode_bge(self, text: str) -> 'tuple[BGESparseVector | None, list[float] | None]':
+        """Return (lexical sparse, aggregated colbert) for a chunk, reusing cached encodings."""
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+        with _BGE_ENCODE_CACHE_LOCK:
+            cached = _BGE_ENCODE_CACHE.get(key)
+            if cached is not None:
+                _BGE_ENCODE_CACHE.move_to_end(key)
+                return cached
+        bge_result = self.bge_client().encode([text], return_dense=False, return_colbert_vecs=True)
+        encoded = (bge_result.first_sparse(), bge_result.first_colbert_agg())
+        with _BGE_ENCODE_CACHE_LOCK:
+            _BGE_ENCODE_CACHE[key] = encoded
+            _BGE_ENCODE_CACHE.move_to_end(key)
+            while len(_BGE_ENCODE_CACHE) > _BGE_ENCODE_CACHE_MAX:
+                _BGE_ENCODE_CACHE.popitem(last=False)
+        return encoded
+
     def process_file_async(self, file_id, force_full_ocr: bool = False):
         """Enqueue background file processing.
 
@@ -349,6 +396,60 @@ class FileProcessor:
                         monthly_used_before = proj_for_limit.get_monthly_tokens_used()
                     except Exception:
                         monthly_used_before = 0
+                pending = []
+
+                def _flush_pending(wait: bool) -> bool:
+                    nonlocal processed_chunks, embedding_tokens_total, ingestion_failed, ingestion_error
+                    batch = _take_upsert_batch(pending, final=wait)
+                    if not batch:
+                        return True
+                    success = self.vector_service().add_documents(
+                        knowledge_file.project_id,
+                        [item['document'] for item in batch],
+                        wait=wait,
+                    )
+                    if not success:
+                        first, last = batch[0], batch[-1]
+                        failure_message = (
+                            f"Upsert nieudany fragment {first['index']}-{last['index']} "
+                            f"point_id={first['document']['document_id']}-{last['document']['document_id']}"
+                        )
+                        logger.warning(
+                            "Failed to upsert chunk into vector store",
+                            extra={'event': 'file_processor_vector_upsert_failed', 'file_id': file_id, 'chunk_index': first['index'], 'chunk_count': len(batch), 'point_id': first['document']['document_id']}
+                        )
+                        try:
+                            db.session.add(FileProcessingLog(knowledge_file_id=knowledge_file.id, project_id=knowledge_file.project_id, event='vector_upsert_error', message=failure_message))
+                            db.session.commit()
+                        except Exception:
+                            db.session.rollback()
+                        ingestion_failed = True
+                        ingestion_error = failure_message
+                        return False
+                    for item in batch:
+                        processed_chunks += 1
+                        tokens = item['tokens']
+                        emb_usage = item['usage']
+                        embedding_tokens_total += tokens
+                        try:
+                            log = AIUsageLog(
+                                project_id=knowledge_file.project_id,
+                                source='embedding',
+                                model=current_app.config.get('EMBEDDING_MODEL','text-embedding-3-large'),
+                                prompt_tokens=emb_usage.prompt_tokens or tokens or 0,
+                                completion_tokens=emb_usage.completion_tokens,
+                                total_tokens=emb_usage.total_tokens or tokens or 0,
+                                metadata_json=json.dumps({
+                                    'knowledge_file_id': knowledge_file.id,
+                                    'chunk_index': item['index'],
+                                    'embedding_usage': emb_usage.to_dict(),
+                                })
+                            )
+                            db.session.add(log)
+                        except Exception:
+                            pass
+                    return True
+
                 for i, chunk in enumerate(chunks):
                     if not chunk or not chunk.strip():
                         continue
@@ -361,7 +462,7 @@ class FileProcessor:
                     try:
                         if proj_for_limit:
                             projected_total = proj_for_limit.fragments_used + 1  # this chunk
-                            if projected_total > proj_for_limit.fragments_limit and processed_chunks == 0:
+                            if projected_total > proj_for_limit.fragments_limit and processed_chunks == 0 and not pending:
                                 # Abort whole file before adding any chunks (hard block)
                                 knowledge_file.status = 'error'
                                 knowledge_file.error_message = 'Limit fragmentów przekroczony – nie można przetworzyć pliku.'
@@ -386,7 +487,7 @@ class FileProcessor:
                     )
                     if proj_for_limit and proj_for_limit.tokens_limit and tokens_est:
                         if (monthly_used_before + monthly_add + tokens_est) > proj_for_limit.tokens_limit:
-                            if processed_chunks == 0:
+                            if processed_chunks == 0 and not pending:
                                 knowledge_file.status = 'error'
                                 knowledge_file.error_message = 'Miesięczny limit tokenów przekroczony'
                                 db.session.commit()
@@ -422,9 +523,7 @@ class FileProcessor:
                     lexical_sparse = None
                     colbert_vector = None
                     try:
-                        bge_result = self.bge_client().encode([chunk], return_dense=False, return_colbert_vecs=True)
-                        lexical_sparse = bge_result.first_sparse()
-                        colbert_vector = bge_result.first_colbert_agg()
+                        lexical_sparse, colbert_vector = self.encode_bge(chunk)
                     except BGEClientError as exc:
                         logger.warning(
                             "BGE ingestion encode failed",
@@ -440,61 +539,42 @@ class FileProcessor:
                     try:
                         base_file_id = int(file_id)
                     except Exception:
-                        base_file_id = abs(hash(str(file_id))) % 100000  # fallback hashing
+                        base_file_id = stable_bucket(file_id, 100000)  # fallback hashing
                     point_id = base_file_id * 100000 + i
-                    success = self.vector_service().add_document(
-                        project_id=knowledge_file.project_id,
-                        document_id=point_id,
-                        text=chunk,
-                        embeddings=embeddings,
-                        lexical=lexical_sparse,
-                        colbert=colbert_vector,
-                        metadata={
-                            'file_id': file_id,
-                            'filename': knowledge_file.original_filename,
-                            'chunk_index': i,
-                            'file_type': knowledge_file.file_type,
-                            'chunk_key': f"{file_id}_{i}"
-                        }
-                    )
-                    if not success:
-                        failure_message = f'Upsert nieudany fragment {i} point_id={point_id}'
-                        logger.warning(
-                            "Failed to upsert chunk into vector store",
-                            extra={'event': 'file_processor_vector_upsert_failed', 'file_id': file_id, 'chunk_index': i, 'point_id': point_id}
-                        )
-                        try:
-                            db.session.add(FileProcessingLog(knowledge_file_id=knowledge_file.id, project_id=knowledge_file.project_id, event='vector_upsert_error', message=failure_message))
-                            db.session.commit()
-                        except Exception:
-                            db.session.rollback()
-                        ingestion_failed = True
-                        ingestion_error = failure_message
+                    try:
+                        tokens = emb_usage.total_tokens or emb_usage.prompt_tokens
+                        if not tokens:
+                            tokens = self.ai_service().count_tokens(chunk)
+                    except Exception:
+                        tokens = 0
+                    # Count queued chunks towards the monthly limit right away so the check above stays exact.
+                    monthly_add += tokens or 0
+                    pending.append({
+                        'index': i,
+                        'tokens': tokens or 0,
+                        'usage': emb_usage,
+                        'document': {
+                            'document_id': point_id,
+                            'text': chunk,
+                            'embeddings': embeddings,
+                            'lexical': lexical_sparse,
+                            'colbert': colbert_vector,
+                            'metadata': {
+                                'file_id': file_id,
+                                'filename': knowledge_file.original_filename,
+                                'chunk_index': i,
+                                'file_type': knowledge_file.file_type,
+                                'chunk_key': f"{file_id}_{i}"
+                            },
+                        },
+                    })
+                    if not _flush_pending(wait=False):
                         break
-                    if success:
-                        processed_chunks += 1
-                        try:
-                            tokens = emb_usage.total_tokens or emb_usage.prompt_tokens
-                            if not tokens:
-                                tokens = self.ai_service().count_tokens(chunk)
-                            embedding_tokens_total += tokens or 0
-                            monthly_add += tokens or 0
-                            log = AIUsageLog(
-                                project_id=knowledge_file.project_id,
-                                source='embedding',
-                                model=current_app.config.get('EMBEDDING_MODEL','text-embedding-3-large'),
-                                prompt_tokens=emb_usage.prompt_tokens or tokens or 0,
-                                completion_tokens=emb_usage.completion_tokens,
-                                total_tokens=emb_usage.total_tokens or tokens or 0,
-                                metadata_json=json.dumps({
-                                    'knowledge_file_id': knowledge_file.id,
-                                    'chunk_index': i,
-                                    'embedding_usage': emb_usage.to_dict(),
-                                })
-                            )
-                            db.session.add(log)
-                        except Exception:
-                            pass
+
+                # Final batch waits for Qdrant; updates apply in order, so earlier unwaited batches are applied too.
+                # _take_upsert_batch always holds items back for this call.
+                if pending and not ingestion_failed:
+                    _flush_pending(wait=True)
 
                 if ingestion_failed:
                     knowledge_file.status = 'error'
@@ -4,6 +4,7 @@ from typing import Optional, Tuple
 import pandas as pd
 
 from app.services.bge_client import BGEClientError
+from app.services.vector_service import stable_bucket
 
 
 def _compact_markdown_from_df(df: pd.DataFrame) -> str:
@@ -81,9 +82,7 @@ def convert_xlsx_to_markdown_and_embed(fp, knowledge_file, do_embed: bool = True
             lexical_sparse = None
             colbert_vector = None
             try:
-                bge_result = fp.bge_client().encode([description_text], return_dense=False, return_colbert_vecs=True)
-                lexical_sparse = bge_result.first_sparse()
-                colbert_vector = bge_result.first_colbert_agg()
+                lexical_sparse, colbert_vector = fp.encode_bge(description_text)
             except BGEClientError as exc:
                 logger.warning(
                     "BGE ingestion encode failed (xlsx)",
@@ -97,7 +96,7 @@ def convert_xlsx_to_markdown_and_embed(fp, knowledge_file, do_embed: bool = True
             try:
                 base_file_id = int(knowledge_file.id)
             except Exception:
-                base_file_id = abs(hash(str(knowledge_file.id))) % 100000
+                base_file_id = stable_bucket(knowledge_file.id, 100000)
             point_id = base_file_id * 100000
             ok = fp.vector_service().add_document(
                 project_id=knowledge_file.project_id,
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import heapq
 import logging
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
@@ -13,6 +14,15 @@ from .ai_providers import (
     ZeroEntropyProvider,
 )
 
+_PREFIX_PROBE_LEN = 120
+
+# Shared zero usage for no-op paths; treated as read-only (UsageTracker copies into its own buckets).
+_EMPTY_USAGE = TokenUsage()
+
+
+def _score_key(item: Dict[str, Any]) -> float:
+    return item.get("score") or 0
+
 
 class RerankService:
     """Orchestrates reranking across supported providers with graceful fallbacks."""
@@ -20,13 +30,19 @@ class RerankService:
     def __init__(self) -> None:
         self._zeroentropy: Optional[ZeroEntropyProvider] = None
         self._novita: Optional[NovitaAIProvider] = None
+        self._logger: Optional[logging.Logger] = None
 
     @property
     def logger(self) -> logging.Logger:
+        cached = self._logger
+        if cached is not None:
+            return cached
         try:
-            return current_app.logger
-        except Exception:
-            return logging.getLogger(__name__)
+            resolved = current_app.logger
+        except RuntimeError:
+            resolved = logging.getLogger(__name__)
+        self._logger = resolved
+        return resolved
 
     def _get_provider(self, name: str):
         normalized = (name or "none").strip().lower()
@@ -73,13 +89,15 @@ class RerankService:
             key = str(doc.get("id")) if doc.get("id") is not None else None
             if key is not None:
                 original_lookup[key] = doc
+        # Built lazily: only needed when a provider strips ids and reorders results.
+        prefix_index: Optional[Dict[str, Dict[str, Any]]] = None
         converted: List[Dict[str, any]] = []
         for idx, ranked_doc in enumerate(ranked):
             key = str(ranked_doc.id) if ranked_doc.id is not None else None
             base: Optional[Dict[str, Any]] = original_lookup.get(key) if key else None
 
             if base is None and originals:
-                meta = ranked_doc.metadata if isinstance(ranked_doc.metadata, dict) else {}
+                meta = ranked_doc.metadata or {}
                 index_hint = None
                 if meta and "__novita_index" in meta:
                     try:
@@ -95,15 +113,22 @@ class RerankService:
             if base is None and originals:
                 probe = (ranked_doc.text or "").strip()
                 if probe:
-                    prefix = probe[:120]
-                    base = next(
-                        (
-                            item
-                            for item in originals
-                            if (item.get("content") or "").startswith(prefix)
-                        ),
-                        None,
-                    )
+                    prefix = probe[:_PREFIX_PROBE_LEN]
+                    if len(prefix) == _PREFIX_PROBE_LEN:
+                        if prefix_index is None:
+                            prefix_index = {}
+                            for item in originals:
+                                prefix_index.setdefault((item.get("content") or "")[:_PREFIX_PROBE_LEN], item)
+                        base = prefix_index.get(prefix)
+                    else:
+                        base = next(
+                            (
+                                item
+                                for item in originals
+                                if (item.get("content") or "").startswith(prefix)
+                            ),
+                            None,
+                        )
             if base is not None:
                 metadata = base.get("metadata")
                 if not isinstance(metadata, dict):
@@ -129,6 +154,28 @@ class RerankService:
             )
         return converted
 
+    @staticmethod
+    def _fallback_ranking(
+        documents: Sequence[Dict[str, Any]],
+        score_threshold: Optional[float],
+        top_limit: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        """Order documents by their existing vector scores, skipping the sort when already ranked."""
+        filtered = [doc for doc in documents if score_threshold is None or (doc.get("score") or 0) >= score_threshold]
+        previous = float("inf")
+        for doc in filtered:
+            score = doc.get("score") or 0
+            if score > previous:
+                break
+            previous = score
+        else:
+            # Vector search already returns hits in descending score order.
+            return filtered[:top_limit]
+        if top_limit is None:
+            filtered.sort(key=_score_key, reverse=True)
+            return filtered
+        return heapq.nlargest(top_limit, filtered, key=_score_key)
+
     def rerank_documents(
         self,
         *,
@@ -140,7 +187,7 @@ class RerankService:
         model: Optional[str] = None,
     ) -> Tuple[List[Dict[str, Any]], TokenUsage]:
         if not documents:
-            return [], TokenUsage()
+            return [], _EMPTY_USAGE
 
         provider_name = provider or current_app.config.get("RERANK_PROVIDER", "none")
         top_limit = top_k if top_k is not None else current_app.config.get("RERANK_TOP_K_DEFAULT", len(documents))
@@ -151,9 +198,7 @@ class RerankService:
         provider_client = self._get_provider(provider_name)
         if provider_client is None:
             # Fallback: apply score threshold on existing vector scores only
-            filtered = [doc for doc in documents if score_threshold is None or (doc.get("score") or 0) >= score_threshold]
-            filtered.sort(key=lambda item: item.get("score") or 0, reverse=True)
-            return filtered[:top_limit], TokenUsage()
+            return self._fallback_ranking(documents, score_threshold, top_limit), _EMPTY_USAGE
 
         def _capture_diagnostics(label: str) -> Dict[str, Any]:
             if not hasattr(provider_client, "last_details"):
@@ -168,7 +213,7 @@ class RerankService:
         provider_diagnostics: Dict[str, Any] = _capture_diagnostics("pre_call")
 
         candidates = self._to_candidates(documents)
-        usage = TokenUsage()
+        usage = _EMPTY_USAGE
         try:
             ranked, usage = provider_client.rerank(
                 query=query,
@@ -197,9 +242,7 @@ class RerankService:
                 },
                 exc_info=True,
             )
-            filtered = [doc for doc in documents if score_threshold is None or (doc.get("score") or 0) >= score_threshold]
-            filtered.sort(key=lambda item: item.get("score") or 0, reverse=True)
-            return filtered[:top_limit], TokenUsage()
+            return self._fallback_ranking(documents, score_threshold, top_limit), _EMPTY_USAGE
 
         if not ranked:
             provider_diagnostics = _capture_diagnostics("empty_result")
@@ -215,9 +258,7 @@ class RerankService:
                     "provider_diagnostics": provider_diagnostics,
                 },
             )
-            filtered = [doc for doc in documents if score_threshold is None or (doc.get("score") or 0) >= score_threshold]
-            filtered.sort(key=lambda item: item.get("score") or 0, reverse=True)
-            return filtered[:top_limit], usage
+            return self._fallback_ranking(documents, score_threshold, top_limit), usage
 
         converted = self._convert_ranked(ranked, documents)
         if score_threshold is not None:
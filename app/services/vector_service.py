@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
+import io
 import logging
 import os
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from contextlib import suppress
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 from flask import current_app
 
 from qdrant_client import QdrantClient, models
@@ -17,6 +26,125 @@ if TYPE_CHECKING:  # pragma: no cover - typing-only imports
     from app.services.ai_components.usage_tracker import UsageTracker
 
 
+_GRPC_CHANNEL_OPTIONS: Dict[str, Any] = {
+    'grpc.keepalive_time_ms': 30_000,
+    'grpc.max_send_message_length': 64 << 20,
+    'grpc.max_receive_message_length': 64 << 20,
+}
+
+# VectorService is created per request; share clients per process so channels are reused.
+# Keys come from app config, so only a handful exist; entries are never evicted, since
+# a dropped client would leak its channel while live VectorService objects still use it.
+_SHARED_CLIENTS: Dict[Tuple[Any, ...], QdrantClient] = {}
+_SHARED_CLIENTS_LOCK = threading.Lock()
+
+# Bounded pool for query-side BGE encodes and per-channel fallback searches.
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='qdrant')
+
+
+class _LRUCache:
+    """Small thread-safe LRU used for process-wide query caches."""
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._data: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+
+# Repeated queries (multi-query variants, retries, popular questions) reuse their
+# dense embedding and BGE encodings; cached values are shared and must not be mutated.
+_QUERY_EMBEDDING_CACHE = _LRUCache(maxsize=1024)
+_QUERY_BGE_CACHE = _LRUCache(maxsize=1024)
+
+# Collections verified (or created) by this process; lets read paths skip the layout check.
+_ENSURED_COLLECTIONS: set[str] = set()
+
+
+def _client_cache_key(kwargs: Dict[str, Any]) -> Tuple[Any, ...]:
+    return tuple(
+        (name, tuple(sorted(value.items())) if isinstance(value, dict) else value)
+        for name, value in sorted(kwargs.items())
+    )
+
+
+_CONFIG_KEYS = (
+    'QDRANT_HOST',
+    'QDRANT_PORT',
+    'QDRANT_GRPC_PORT',
+    'QDRANT_API_KEY',
+    'QDRANT_ALLOW_INSECURE_FALLBACK',
+    'QDRANT_PREFER_GRPC',
+    'QDRANT_POOL_SIZE',
+    'QDRANT_TIMEOUT',
+    'QDRANT_DEBUG',
+    'QDRANT_SCORE_THRESHOLD',
+    'EMBEDDING_MODEL',
+    'EMBEDDING_DIM',
+    'COLBERT_DIM',
+    'PREFETCH_LIMIT',
+    'COLBERT_CANDIDATES',
+    'HYBRID_RRF_K',
+    'RRF_DENSE_WEIGHT',
+    'RRF_SPARSE_WEIGHT',
+    'RRF_COLBERT_WEIGHT',
+    'BGE_M3_TIMEOUT',
+)
+_SCALAR_TYPES = (str, int, float, bool)
+_UINT32_MASK = 0xFFFFFFFF
+
+
+def stable_bucket(value: Any, modulo: int) -> int:
+    """Map a non-integer identifier to a bucket that is stable across processes.
+
+    Built-in ``hash()`` is salted per process (PYTHONHASHSEED), so it cannot be used
+    for ids that are persisted in Qdrant.
+    """
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % modulo
+
+
+@lru_cache(maxsize=4)
+def _collection_layout(
+    dense_dim: int, colbert_dim: int
+) -> Tuple[Dict[str, models.VectorParams], Dict[str, models.SparseVectorParams]]:
+    """Build the expected collection layout once per dimension pair; callers must not mutate it."""
+    vectors = {
+        'dense': models.VectorParams(size=dense_dim, distance=models.Distance.COSINE),
+        'colbert': models.VectorParams(size=colbert_dim, distance=models.Distance.COSINE),
+    }
+    sparse_vectors = {
+        'lexical': models.SparseVectorParams(),
+    }
+    return vectors, sparse_vectors
+
+
+def _vector_size(params: Any) -> Optional[int]:
+    return getattr(params, 'size', None) or getattr(params, 'dim', None)
+
+
+@lru_cache(maxsize=1024)
+def _collection_name_cached(project_id: Any) -> str:
+    try:
+        project_int = int(project_id)
+    except Exception:
+        project_int = stable_bucket(project_id, 1_000_000)
+    return f"project_{project_int}"
+
+
 class VectorService:
     """High level helper around Qdrant hybrid search."""
 
@@ -25,6 +153,8 @@ class VectorService:
         self._bge_client: Optional[BGEClient] = None
         self._debug_logs: List[Dict[str, Any]] = []
         self._search_diagnostics: List[Dict[str, Any]] = []
+        self._config_snapshot: Optional[Dict[str, Any]] = None
+        self._resolver_defaults_cache: Optional[Dict[str, Any]] = None
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -35,74 +165,93 @@ class VectorService:
         except Exception:  # pragma: no cover - fallback when outside app context
             return logging.getLogger(__name__)
 
+    def _config(self) -> Dict[str, Any]:
+        """Snapshot the settings this service reads so hot paths skip the current_app proxy."""
+        if self._config_snapshot is None:
+            try:
+                config = current_app.config
+            except RuntimeError:  # outside app context; retry once a context exists
+                return {}
+            self._config_snapshot = {key: config[key] for key in _CONFIG_KEYS if key in config}
+        return self._config_snapshot
+
     def _debug_enabled(self) -> bool:
         try:
-            return bool(current_app.config.get('QDRANT_DEBUG'))
+            return bool(self._config().get('QDRANT_DEBUG'))
         except Exception:
             return False
 
     def _bge(self) -> BGEClient:
         if self._bge_client is None:
-            self._bge_client = BGEClient()
+            self._bge_client = BGEClient(timeout=self._config().get('BGE_M3_TIMEOUT'))
         return self._bge_client
 
     def _client_kwargs(self) -> Dict[str, Any]:
-        config = getattr(current_app, 'config', {})
+        config = self._config()
         host = config.get('QDRANT_HOST') or os.environ.get('QDRANT_HOST') or 'localhost'
         port = config.get('QDRANT_PORT') or os.environ.get('QDRANT_PORT') or 6333
         api_key = config.get('QDRANT_API_KEY') or os.environ.get('QDRANT_API_KEY')
         allow_insecure = bool(config.get('QDRANT_ALLOW_INSECURE_FALLBACK', False))
         prefer_grpc = bool(config.get('QDRANT_PREFER_GRPC', False))
+        grpc_port = config.get('QDRANT_GRPC_PORT') or os.environ.get('QDRANT_GRPC_PORT') or 6334
+        pool_size = config.get('QDRANT_POOL_SIZE') or 64
         timeout = config.get('QDRANT_TIMEOUT') or 30.0
 
         kwargs: Dict[str, Any] = {
             'host': str(host),
             'port': int(port),
+            'grpc_port': int(grpc_port),
             'prefer_grpc': prefer_grpc,
             'timeout': float(timeout),
             'https': not allow_insecure,
+            'pool_size': int(pool_size),
         }
+        if prefer_grpc:
+            kwargs['grpc_options'] = dict(_GRPC_CHANNEL_OPTIONS)
         if api_key:
             kwargs['api_key'] = str(api_key)
         return kwargs
 
+    def _build_client(self, kwargs: Dict[str, Any]) -> QdrantClient:
+        # No REST fallback here: the gRPC channel connects lazily, so an unreachable
+        # gRPC port only surfaces on the first query. gRPC is therefore opt-in.
+        try:
+            return QdrantClient(**kwargs)
+        except Exception as exc:  # pragma: no cover - network/SDK boundary
+            self._logger().error(
+                "Failed to create Qdrant client",
+                extra={'event': 'qdrant_client_init_failed', 'error': str(exc)}
+            )
+            raise
+
     def get_client(self) -> QdrantClient:
         if self._client is None:
-            try:
-                self._client = QdrantClient(**self._client_kwargs())
-            except Exception as exc:  # pragma: no cover - network/SDK boundary
-                self._logger().error(
-                    "Failed to create Qdrant client",
-                    extra={'event': 'qdrant_client_init_failed', 'error': str(exc)}
-                )
-                raise
+            kwargs = self._client_kwargs()
+            key = _client_cache_key(kwargs)
+            with _SHARED_CLIENTS_LOCK:
+                client = _SHARED_CLIENTS.get(key)
+                if client is None:
+                    client = self._build_client(kwargs)
+                    _SHARED_CLIENTS[key] = client
+            self._client = client
         return self._client
 
     def _collection_name(self, project_id: int | str) -> str:
         try:
-            project_int = int(project_id)
-        except Exception:
-            project_int = abs(hash(str(project_id))) % 1_000_000
-        return f"project_{project_int}"
+            return _collection_name_cached(project_id)
+        except TypeError:  # unhashable identifier
+            return _collection_name_cached(str(project_id))
 
     def _expected_collection_layout(self) -> Tuple[Dict[str, models.VectorParams], Dict[str, models.SparseVectorParams]]:
         try:
-            dense_dim = int(current_app.config.get('EMBEDDING_DIM', 1024))
+            dense_dim = int(self._config().get('EMBEDDING_DIM', 1024))
         except Exception:
             dense_dim = 1024
         try:
-            colbert_dim = int(current_app.config.get('COLBERT_DIM', 1024))
+            colbert_dim = int(self._config().get('COLBERT_DIM', 1024))
         except Exception:
             colbert_dim = 1024
-
-        vectors = {
-            'dense': models.VectorParams(size=dense_dim, distance=models.Distance.COSINE),
-            'colbert': models.VectorParams(size=colbert_dim, distance=models.Distance.COSINE),
-        }
-        sparse_vectors = {
-            'lexical': models.SparseVectorParams(),
-        }
-        return vectors, sparse_vectors
+        return _collection_layout(dense_dim, colbert_dim)
 
     def _collection_matches_layout(
         self,
@@ -110,46 +259,29 @@ class VectorService:
         expected_vectors: Dict[str, models.VectorParams],
         expected_sparse: Dict[str, models.SparseVectorParams],
     ) -> bool:
-        def _vector_size(params: Any) -> Optional[int]:
-            return getattr(params, 'size', None) or getattr(params, 'dim', None)
+        config = getattr(existing, 'config', None)
 
-        vectors_actual = None
-        with suppress(Exception):
-            vectors_actual = getattr(existing, 'vectors', None)
+        vectors_actual = getattr(existing, 'vectors', None)
         if vectors_actual is None:
-            with suppress(Exception):
-                vectors_actual = getattr(existing, 'config', None)
-                if vectors_actual is not None:
-                    vectors_actual = getattr(vectors_actual, 'vectors', None)
-
+            vectors_actual = getattr(config, 'vectors', None)
         if isinstance(vectors_actual, dict):
-            for name, expected in expected_vectors.items():
-                actual = vectors_actual.get(name)
-                if actual is None:
-                    return False
-                if _vector_size(actual) != _vector_size(expected):
-                    return False
+            if any(
+                _vector_size(vectors_actual.get(name)) != _vector_size(expected)
+                for name, expected in expected_vectors.items()
+            ):
+                return False
         elif isinstance(vectors_actual, models.VectorParams):
-            expected_names = list(expected_vectors.keys())
-            if len(expected_names) != 1:
+            if len(expected_vectors) != 1:
                 return False
-            expected = expected_vectors[expected_names[0]]
+            (expected,) = expected_vectors.values()
             if _vector_size(vectors_actual) != _vector_size(expected):
                 return False
 
-        sparse_actual = None
-        with suppress(Exception):
-            sparse_actual = getattr(existing, 'sparse_vectors', None)
+        sparse_actual = getattr(existing, 'sparse_vectors', None)
         if sparse_actual is None:
-            with suppress(Exception):
-                sparse_actual = getattr(existing, 'config', None)
-                if sparse_actual is not None:
-                    sparse_actual = getattr(sparse_actual, 'sparse_vectors', None)
-
+            sparse_actual = getattr(config, 'sparse_vectors', None)
         if isinstance(sparse_actual, dict):
-            for name in expected_sparse.keys():
-                if name not in sparse_actual:
-                    return False
+            return all(name in sparse_actual for name in expected_sparse)
 
         return True
 
@@ -205,18 +337,32 @@ class VectorService:
             return None
 
     def _sanitize_value(self, value: Any, *, max_list: int = 50) -> Any:
-        if isinstance(value, (str, int, float, bool)) or value is None:
+        if value is None or isinstance(value, _SCALAR_TYPES):
             return value
         if isinstance(value, dict):
-            return {str(k): self._sanitize_value(v, max_list=max_list) for k, v in value.items()}
+            return {
+                str(k): v if v is None or isinstance(v, _SCALAR_TYPES) else self._sanitize_value(v, max_list=max_list)
+                for k, v in value.items()
+            }
         if isinstance(value, (list, tuple)):
-            return [self._sanitize_value(v, max_list=max_list) for v in list(value)[:max_list]]
+            # Slice before walking so oversized lists are never copied in full.
+            return [
+                v if v is None or isinstance(v, _SCALAR_TYPES) else self._sanitize_value(v, max_list=max_list)
+                for v in value[:max_list]
+            ]
         return str(value)
 
     def _sanitize_metadata(self, metadata: Any) -> Dict[str, Any]:
         if not isinstance(metadata, dict):
             return {}
-        return {str(k): self._sanitize_value(v) for k, v in metadata.items()}
+        sanitized: Dict[str, Any] = {}
+        for key, value in metadata.items():
+            # Payload values are overwhelmingly scalars; only recurse for containers/objects.
+            if value is None or isinstance(value, _SCALAR_TYPES):
+                sanitized[str(key)] = value
+            else:
+                sanitized[str(key)] = self._sanitize_value(value)
+        return sanitized
 
     def _extract_file_name(self, metadata: Dict[str, Any]) -> Optional[str]:
         for key in ('filename', 'file_name', 'name', 'title'):
@@ -242,10 +388,9 @@ class VectorService:
         metadata: Dict[str, Any],
         content: Any,
         matched_query: Any | None = None,
-        extra: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         metadata = metadata or {}
-        entry = {
+        return {
             'id': '' if identifier is None else str(identifier),
             'score': self._safe_float(score),
             'rank': int(rank),
@@ -257,9 +402,6 @@ class VectorService:
             'metadata': metadata,
             'matched_query': matched_query,
         }
-        if extra:
-            entry.update(extra)
-        return entry
 
     def _serialize_point(self, point: Any, *, channel: str, rank: int) -> Dict[str, Any]:
         payload = getattr(point, 'payload', {}) or {}
@@ -275,13 +417,16 @@ class VectorService:
             matched_query=metadata.get('matched_query') or metadata.get('matchedQuery'),
         )
 
+    def _serialize_points_batch(self, points: List[Any], *, channel: str) -> List[Dict[str, Any]]:
+        return [self._serialize_point(point, channel=channel, rank=idx) for idx, point in enumerate(points, start=1)]
+
     def _serialize_document_snapshot(self, doc: Dict[str, Any], *, rank: int) -> Dict[str, Any]:
         metadata_raw = doc.get('metadata') if isinstance(doc, dict) else {}
         metadata = self._sanitize_metadata(metadata_raw)
         hybrid_scores = metadata.get('hybrid_scores') if isinstance(metadata.get('hybrid_scores'), dict) else {}
         source = self._dominant_channel(hybrid_scores)
         rerank_score = self._safe_float(metadata.get('rerank_score') or metadata.get('rerankScore'))
-        return self._build_entry(
+        entry = self._build_entry(
             identifier=doc.get('id'),
             score=doc.get('score'),
             rank=rank,
@@ -289,22 +434,22 @@ class VectorService:
             metadata=metadata,
             content=doc.get('content'),
             matched_query=metadata.get('matched_query') or metadata.get('matchedQuery'),
-            extra={'rerank_score': rerank_score},
         )
+        entry['rerank_score'] = rerank_score
+        return entry
 
     def _dominant_channel(self, scores: Dict[str, Any]) -> str:
         if not isinstance(scores, dict) or not scores:
             return 'dense'
-        mapped: Dict[str, float] = {}
+        best_key: Any = None
+        best_score = float('-inf')
         for key, value in scores.items():
-            channel = 'sparse' if key == 'lexical' else str(key)
             score = self._safe_float(value)
-            if score is None:
-                continue
-            mapped[channel] = score
-        if not mapped:
+            if score is not None and (best_key is None or score > best_score):
+                best_key, best_score = key, score
+        if best_key is None:
             return 'dense'
-        return max(mapped.items(), key=lambda item: item[1])[0]
+        return 'sparse' if best_key == 'lexical' else str(best_key)
 
     def _build_channel_snapshots(
         self,
@@ -317,10 +462,7 @@ class VectorService:
             if not hits:
                 continue
             mapped_channel = 'sparse' if channel == 'lexical' else channel
-            entries: List[Dict[str, Any]] = []
-            for idx, point in enumerate(hits[:max_entries], start=1):
-                entries.append(self._serialize_point(point, channel=mapped_channel, rank=idx))
-            snapshots[mapped_channel] = entries
+            snapshots[mapped_channel] = self._serialize_points_batch(hits[:max_entries], channel=mapped_channel)
         return snapshots
 
     def _build_search_diagnostic(
@@ -347,11 +489,15 @@ class VectorService:
         }
 
     def _log_debug_results(self, hits: List[Any], threshold: Optional[float], label: str) -> None:
-        if not self._debug_enabled() or not hits:
+        if not hits or not self._debug_enabled():
             return
+        self._record_debug_results(hits, threshold, label)
 
+    def _record_debug_results(self, hits: List[Any], threshold: Optional[float], label: str) -> None:
+        """Render the results table unconditionally; callers check ``_debug_enabled`` first."""
         headers = ['#', 'Score', 'Document', 'Chunk']
-        rows: List[List[str]] = []
+        widths = [len(h) for h in headers]
+        rows: List[Tuple[str, str, str, str]] = []
         files: List[str] = []
         seen_files: set[str] = set()
 
@@ -367,27 +513,34 @@ class VectorService:
                 if file_str not in seen_files:
                     files.append(file_str)
                     seen_files.add(file_str)
-            rows.append(
-                [
-                    str(idx),
-                    f"{float(score):.5f}" if isinstance(score, (int, float)) else str(score or '—'),
-                    text_preview or '—',
-                    str(chunk_id or '—'),
-                ]
+            row = (
+                str(idx),
+                f"{float(score):.5f}" if isinstance(score, (int, float)) else str(score or '—'),
+                text_preview or '—',
+                str(chunk_id or '—'),
             )
-
-        widths = [len(h) for h in headers]
-        for row in rows:
+            # Track column widths while collecting rows so no second pass is needed.
             for i, cell in enumerate(row):
-                widths[i] = max(widths[i], len(cell))
+                if len(cell) > widths[i]:
+                    widths[i] = len(cell)
+            rows.append(row)
+
+        buf = io.StringIO()
 
-        def _fmt(row: List[str]) -> str:
-            return ' | '.join(cell.ljust(widths[i]) for i, cell in enumerate(row))
+        def _write_row(row: Sequence[str]) -> None:
+            last = len(row) - 1
+            for i, cell in enumerate(row):
+                buf.write(cell.ljust(widths[i]))
+                if i != last:
+                    buf.write(' | ')
 
-        divider = '-+-'.join('-' * w for w in widths)
-        table_lines = [_fmt(headers), divider]
-        table_lines.extend(_fmt(row) for row in rows)
-        table = '\n'.join(table_lines)
+        _write_row(headers)
+        buf.write('\n')
+        buf.write('-+-'.join('-' * w for w in widths))
+        for row in rows:
+            buf.write('\n')
+            _write_row(row)
+        table = buf.getvalue()
 
         self._debug_logs.append(
             {
@@ -402,6 +555,45 @@ class VectorService:
     # ------------------------------------------------------------------
     # Resolver helpers
     # ------------------------------------------------------------------
+    def _resolver_defaults(self) -> Dict[str, Any]:
+        """Config-derived resolver defaults, parsed once per config snapshot."""
+        if self._resolver_defaults_cache is not None:
+            return self._resolver_defaults_cache
+        config = self._config()
+
+        def _int(name: str, default: Optional[int]) -> Optional[int]:
+            try:
+                return int(config.get(name, default))
+            except Exception:
+                return default
+
+        def _weight(name: str, default: float) -> float:
+            try:
+                return float(config.get(name, default) or default)
+            except Exception:
+                return default
+
+        threshold = 0.0
+        cfg_value = config.get('QDRANT_SCORE_THRESHOLD')
+        with suppress(Exception):
+            if cfg_value is not None:
+                threshold = float(cfg_value)
+
+        defaults = {
+            'prefetch_limit': _int('PREFETCH_LIMIT', None),
+            'colbert_candidates': max(1, _int('COLBERT_CANDIDATES', 15)),
+            'rrf_k': max(1, _int('HYBRID_RRF_K', 60)),
+            'rrf_weights': {
+                'dense': _weight('RRF_DENSE_WEIGHT', 0.6),
+                'lexical': _weight('RRF_SPARSE_WEIGHT', 0.3),
+                'colbert': _weight('RRF_COLBERT_WEIGHT', 0.1),
+            },
+            'score_threshold': threshold,
+        }
+        if self._config_snapshot is not None:
+            self._resolver_defaults_cache = defaults
+        return defaults
+
     def resolve_prefetch_limit(self, requested_limit: int, override: Optional[int] = None) -> int:
         base = max(1, int(requested_limit or 1))
         if override is not None:
@@ -409,11 +601,8 @@ class VectorService:
                 candidate = int(override)
                 if candidate > 0:
                     return max(base, candidate)
-        try:
-            configured = int(current_app.config.get('PREFETCH_LIMIT', base))
-        except Exception:
-            configured = base
-        return max(base, configured)
+        configured = self._resolver_defaults()['prefetch_limit']
+        return base if configured is None else max(base, configured)
 
     def resolve_colbert_candidates(self, override: Optional[int] = None) -> int:
         if override is not None:
@@ -421,11 +610,7 @@ class VectorService:
                 value = int(override)
                 if value > 0:
                     return value
-        try:
-            configured = int(current_app.config.get('COLBERT_CANDIDATES', 15))
-        except Exception:
-            configured = 15
-        return max(1, configured)
+        return self._resolver_defaults()['colbert_candidates']
 
     def resolve_rrf_k(self, override: Optional[int] = None) -> int:
         if override is not None:
@@ -433,24 +618,11 @@ class VectorService:
                 value = int(override)
                 if value > 0:
                     return value
-        try:
-            configured = int(current_app.config.get('HYBRID_RRF_K', 60))
-        except Exception:
-            configured = 60
-        return max(1, configured)
+        return self._resolver_defaults()['rrf_k']
 
     def resolve_rrf_weights(self, override: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
-        def _cfg(name: str, default: float) -> float:
-            try:
-                return float(current_app.config.get(name, default) or default)
-            except Exception:
-                return default
-
-        weights = {
-            'dense': _cfg('RRF_DENSE_WEIGHT', 0.6),
-            'lexical': _cfg('RRF_SPARSE_WEIGHT', 0.3),
-            'colbert': _cfg('RRF_COLBERT_WEIGHT', 0.1),
-        }
+        # Copy: callers attach the weights to result metadata and may adjust them.
+        weights = dict(self._resolver_defaults()['rrf_weights'])
 
         if not override:
             return weights
@@ -474,11 +646,7 @@ class VectorService:
         if override is not None:
             with suppress(Exception):
                 return float(override)
-        cfg_value = current_app.config.get('QDRANT_SCORE_THRESHOLD')
-        with suppress(Exception):
-            if cfg_value is not None:
-                return float(cfg_value)
-        return 0.0
+        return self._resolver_defaults()['score_threshold']
 
     def resolve_hybrid_per_vector_limit(self, requested_limit: int, override: Optional[int] = None) -> int:
         return self.resolve_prefetch_limit(requested_limit, override)
@@ -500,6 +668,7 @@ class VectorService:
                 existing = client.get_collection(collection_name)
 
             if existing and self._collection_matches_layout(existing, vectors_expected, sparse_expected):
+                _ENSURED_COLLECTIONS.add(collection_name)
                 return True
 
             try:
@@ -519,6 +688,7 @@ class VectorService:
                         vectors_config=vectors_expected,
                         sparse_vectors_config=sparse_expected,
                     )
+                _ENSURED_COLLECTIONS.add(collection_name)
                 return True
             except Exception as setup_err:  # pragma: no cover - network boundary
                 self._logger().error(
@@ -533,22 +703,46 @@ class VectorService:
             )
             return False
 
+    def _ensure_collection(self, project_id: int | str) -> bool:
+        """Like create_collection, but skips the round-trip once this process has verified the collection."""
+        if self._collection_name(project_id) in _ENSURED_COLLECTIONS:
+            return True
+        return self.create_collection(project_id)
+
     def _normalize_sparse(self, lexical: Optional[BGESparseVector | Dict[str, Any]]) -> Optional[models.SparseVector]:
         if lexical is None:
             return None
         if isinstance(lexical, BGESparseVector):
-            indices = [int(i) % (2 ** 32) for i in lexical.indices]
-            return models.SparseVector(indices=indices, values=list(lexical.values))
-        if isinstance(lexical, dict):
-            with suppress(Exception):
-                indices = [int(i) % (2 ** 32) for i in lexical.get('indices', [])]
-                values = [float(v) for v in lexical.get('values', [])]
-                return models.SparseVector(indices=indices, values=values)
-        return None
+            raw_indices, raw_values = lexical.indices, lexical.values
+        elif isinstance(lexical, dict):
+            raw_indices, raw_values = lexical.get('indices', []), lexical.get('values', [])
+        else:
+            return None
+        try:
+            indices = np.asarray(raw_indices, dtype=np.int64)
+            values = np.asarray(raw_values, dtype=np.float64)
+        except (TypeError, ValueError):
+            return None
+        if indices.ndim != 1 or indices.shape != values.shape:
+            return None
+        # Zero weights contribute nothing to the dot product; drop them in the
+        # same pass and skip the channel entirely when nothing is left.
+        # flatnonzero yields one position array reused for both gathers, instead of a
+        # boolean mask that numpy would re-scan for each fancy index.
+        keep = np.flatnonzero(values)
+        if not keep.size:
+            return None
+        if keep.size != values.size:
+            indices = indices[keep]
+            values = values[keep]
+        # Masking int64 with 0xFFFFFFFF matches Python's non-negative ``% 2**32``.
+        return models.SparseVector(
+            indices=(indices & _UINT32_MASK).tolist(),
+            values=values.tolist(),
+        )
 
-    def add_document(
+    def _build_point(
         self,
-        project_id: int | str,
         document_id: Any,
         text: str,
         embeddings: List[float],
@@ -556,45 +750,89 @@ class VectorService:
         lexical: Optional[BGESparseVector | Dict[str, Any]] = None,
         colbert: Optional[List[float]] = None,
         metadata: Optional[Dict[str, Any]] = None,
-    ) -> bool:
+    ) -> models.PointStruct:
+        vectors: Dict[str, Any] = {'dense': embeddings}
+        if colbert:
+            vectors['colbert'] = list(colbert)
+
+        sparse_vector = self._normalize_sparse(lexical)
+        if sparse_vector:
+            vectors['lexical'] = sparse_vector.dict(exclude_none=True)
+
+        payload = {
+            'text': text,
+            'document_id': document_id,
+        }
+        if metadata:
+            payload.update(metadata)
+
+        return models.PointStruct(id=document_id, vector=vectors, payload=payload)
+
+    def add_documents(self, project_id: int | str, documents: List[Dict[str, Any]], *, wait: bool = True) -> bool:
+        """Upsert several chunks in one request.
+
+        Each document dict carries the ``add_document`` arguments: ``document_id``, ``text``,
+        ``embeddings`` and optionally ``lexical``, ``colbert`` and ``metadata``. With
+        ``wait=False`` Qdrant acknowledges once the write is queued; a later ``wait=True``
+        upsert to the same collection returns only after all earlier writes are applied.
+        """
+        if not documents:
+            return True
         try:
             client = self.get_client()
             collection_name = self._collection_name(project_id)
             self.create_collection(project_id)
 
-            vectors: Dict[str, Any] = {'dense': embeddings}
-            if colbert:
-                vectors['colbert'] = list(colbert)
-
-            sparse_vector = self._normalize_sparse(lexical)
-            if sparse_vector:
-                vectors['lexical'] = sparse_vector.dict(exclude_none=True)
-
-            payload = {
-                'text': text,
-                'document_id': document_id,
-            }
-            if metadata:
-                payload.update(metadata)
-
-            client.upsert(
-                collection_name=collection_name,
-                points=[
-                    models.PointStruct(
-                        id=document_id,
-                        vector=vectors,
-                        payload=payload,
-                    )
-                ],
-            )
+            points = [
+                self._build_point(
+                    doc['document_id'],
+                    doc['text'],
+                    doc['embeddings'],
+                    lexical=doc.get('lexical'),
+                    colbert=doc.get('colbert'),
+                    metadata=doc.get('metadata'),
+                )
+                for doc in documents
+            ]
+            client.upsert(collection_name=collection_name, points=points, wait=wait)
             return True
         except Exception as exc:
             self._logger().error(
-                "Error adding document to Qdrant",
-                extra={'event': 'qdrant_add_document_error', 'project_id': project_id, 'document_id': document_id, 'error': str(exc)}
+                "Error adding documents to Qdrant",
+                extra={
+                    'event': 'qdrant_add_document_error',
+                    'project_id': project_id,
+                    'document_ids': [doc.get('document_id') for doc in documents],
+                    'error': str(exc),
+                }
             )
             return False
 
+    def add_document(
+        self,
+        project_id: int | str,
+        document_id: Any,
+        text: str,
+        embeddings: List[float],
+        *,
+        lexical: Optional[BGESparseVector | Dict[str, Any]] = None,
+        colbert: Optional[List[float]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        return self.add_documents(
+            project_id,
+            [
+                {
+                    'document_id': document_id,
+                    'text': text,
+                    'embeddings': embeddings,
+                    'lexical': lexical,
+                    'colbert': colbert,
+                    'metadata': metadata,
+                }
+            ],
+        )
+
     def delete_document(self, project_id: int | str, document_id: Any) -> bool:
         try:
             client = self.get_client()
@@ -619,12 +857,12 @@ class VectorService:
         try:
             client = self.get_client()
             collection_name = self._collection_name(project_id)
-            self.create_collection(project_id)
+            self._ensure_collection(project_id)
 
             try:
                 base_file_id = int(file_id)
             except Exception:
-                base_file_id = abs(hash(str(file_id))) % 100_000
+                base_file_id = stable_bucket(file_id, 100_000)
 
             point_id = base_file_id * 100_000 + int(chunk_index)
             records = client.retrieve(
@@ -653,7 +891,7 @@ class VectorService:
         try:
             client = self.get_client()
             collection_name = self._collection_name(project_id)
-            self.create_collection(project_id)
+            self._ensure_collection(project_id)
 
             point_id = reference.get('point_id')
             if point_id is not None:
@@ -696,6 +934,7 @@ class VectorService:
             client = self.get_client()
             collection_name = self._collection_name(project_id)
             client.delete_collection(collection_name)
+            _ENSURED_COLLECTIONS.discard(collection_name)
             return True
         except Exception as exc:
             self._logger().error(
@@ -715,31 +954,39 @@ class VectorService:
             try:
                 base_file_id = int(file_id)
             except Exception:
-                base_file_id = abs(hash(str(file_id))) % 100_000
+                base_file_id = stable_bucket(file_id, 100_000)
 
-            deleted_total = 0
             batch_size = 512
-            buffer: List[int] = []
-            for idx in range(int(chunks_count)):
-                buffer.append(base_file_id * 100_000 + idx)
-                if len(buffer) >= batch_size:
-                    try:
-                        client.delete(collection_name=collection_name, points_selector=PointIdsList(points=buffer))
-                        deleted_total += len(buffer)
-                    except Exception as batch_exc:
-                        self._logger().warning(
-                            "Partial failure deleting Qdrant batch",
-                            extra={'event': 'qdrant_batch_delete_error', 'collection': collection_name, 'error': str(batch_exc)}
-                        )
-                    buffer = []
-            if buffer:
+            first_id = base_file_id * 100_000
+            point_ids = range(first_id, first_id + int(chunks_count))
+            batches: List[List[int]] = [
+                list(point_ids[start:start + batch_size]) for start in range(0, len(point_ids), batch_size)
+            ]
+
+            try:
+                # One round-trip for every batch instead of a delete call per batch.
+                client.batch_update_points(
+                    collection_name=collection_name,
+                    update_operations=[
+                        models.DeleteOperation(delete=PointIdsList(points=batch)) for batch in batches
+                    ],
+                )
+                return sum(len(batch) for batch in batches)
+            except Exception as bulk_exc:
+                self._logger().warning(
+                    "Bulk Qdrant delete failed; retrying per batch",
+                    extra={'event': 'qdrant_bulk_delete_error', 'collection': collection_name, 'error': str(bulk_exc)}
+                )
+
+            deleted_total = 0
+            for batch in batches:
                 try:
-                    client.delete(collection_name=collection_name, points_selector=PointIdsList(points=buffer))
-                    deleted_total += len(buffer)
-                except Exception as final_exc:
+                    client.delete(collection_name=collection_name, points_selector=PointIdsList(points=batch))
+                    deleted_total += len(batch)
+                except Exception as batch_exc:
                     self._logger().warning(
-                        "Final batch delete error",
-                        extra={'event': 'qdrant_final_batch_delete_error', 'collection': collection_name, 'error': str(final_exc)}
+                        "Partial failure deleting Qdrant batch",
+                        extra={'event': 'qdrant_batch_delete_error', 'collection': collection_name, 'error': str(batch_exc)}
                     )
             return deleted_total
         except Exception as exc:
@@ -749,6 +996,77 @@ class VectorService:
             )
             return 0
 
+    def _encode_query(self, query_text: str) -> Tuple[Optional[BGESparseVector], Optional[List[float]]]:
+        try:
+            bge_result = self._bge().encode([query_text], return_dense=False, return_colbert_vecs=True)
+            return bge_result.first_sparse(), bge_result.first_colbert_agg()
+        except (BGEClientError, ValueError) as exc:
+            self._logger().warning(
+                "BGE query failed; continuing with dense-only retrieval",
+                extra={'event': 'bge_query_failed', 'error': str(exc)}
+            )
+        except Exception as exc:
+            self._logger().error(
+                "Unexpected error calling BGE service",
+                extra={'event': 'bge_unexpected_error', 'error': str(exc)}
+            )
+        return None, None
+
+    def _encode_query_in_context(
+        self, app: Any, query_text: str
+    ) -> Tuple[Optional[BGESparseVector], Optional[List[float]]]:
+        with app.app_context():
+            return self._encode_query(query_text)
+
+    def search_many(self, project_id: int | str, requests: List[models.QueryRequest]) -> List[List[Any]]:
+        """Run several vector queries against the project collection in one round-trip."""
+        if not requests:
+            return []
+        client = self.get_client()
+        responses = client.query_batch_points(
+            collection_name=self._collection_name(project_id),
+            requests=requests,
+        )
+        return [list(getattr(response, 'points', None) or []) for response in responses]
+
+    def _search_channels(
+        self,
+        project_id: int | str,
+        channel_requests: List[Tuple[str, models.QueryRequest]],
+    ) -> Dict[str, List[Any]]:
+        try:
+            batched = self.search_many(project_id, [request for _, request in channel_requests])
+            return {channel: hits for (channel, _), hits in zip(channel_requests, batched)}
+        except Exception as exc:
+            if len(channel_requests) == 1:
+                raise
+            self._logger().warning(
+                "Batched Qdrant search failed; retrying channels individually",
+                extra={'event': 'qdrant_batch_search_failed', 'error': str(exc)}
+            )
+
+        # Resolve the client up front: pool threads run outside the Flask app context.
+        self.get_client()
+        futures = {
+            channel: _SEARCH_POOL.submit(self.search_many, project_id, [request])
+            for channel, request in channel_requests
+        }
+        hits_by_channel: Dict[str, List[Any]] = {}
+        for channel, future in futures.items():
+            if channel == 'dense':
+                # Dense retrieval is mandatory; let failures surface to the caller.
+                hits_by_channel[channel] = future.result()[0]
+                continue
+            try:
+                hits_by_channel[channel] = future.result()[0]
+            except Exception as exc:
+                hits_by_channel[channel] = []
+                self._logger().warning(
+                    "Lexical search failed" if channel == 'lexical' else "ColBERT search failed",
+                    extra={'event': f'qdrant_{channel}_search_failed', 'error': str(exc)}
+                )
+        return hits_by_channel
+
     def _rrf_merge(
         self,
         hits_by_channel: Dict[str, List[Any]],
@@ -758,7 +1076,12 @@ class VectorService:
         score_threshold: Optional[float],
         weights: Dict[str, float],
     ) -> List[Dict[str, Any]]:
-        combined: Dict[str, Dict[str, Any]] = {}
+        # Flat parallel lists indexed by first-seen order instead of a dict of per-point dicts.
+        index_of: Dict[str, int] = {}
+        points: List[Any] = []
+        rrf_scores: List[float] = []
+        modal_by_index: List[Dict[str, float]] = []
+        best_scores: List[Optional[float]] = []
         for channel, hits in hits_by_channel.items():
             if not hits:
                 continue
@@ -766,64 +1089,70 @@ class VectorService:
             if weight <= 0:
                 continue
             for rank, point in enumerate(hits, start=1):
-                point_id = getattr(point, 'id', None)
+                # Qdrant always returns ScoredPoint; getattr defaults only cover odd stubs.
+                try:
+                    point_id = point.id
+                    score = point.score
+                except AttributeError:
+                    point_id = getattr(point, 'id', None)
+                    score = getattr(point, 'score', None)
                 if point_id is None:
                     continue
                 key = str(point_id)
-                entry = combined.setdefault(
-                    key,
-                    {
-                        'point': point,
-                        'rrf': 0.0,
-                        'modal_scores': {},
-                    },
-                )
-                entry['rrf'] += weight * (1.0 / (rrf_k + rank))
-                score = getattr(point, 'score', None)
+                idx = index_of.get(key)
+                if idx is None:
+                    idx = len(points)
+                    index_of[key] = idx
+                    points.append(point)
+                    rrf_scores.append(0.0)
+                    modal_by_index.append({})
+                    best_scores.append(None)
+                rrf_scores[idx] += weight * (1.0 / (rrf_k + rank))
                 if score is not None:
-                    entry['modal_scores'][channel] = float(score)
+                    score = float(score)
+                    modal_by_index[idx][channel] = score
+                    best = best_scores[idx]
+                    if best is None or score > best:
+                        best_scores[idx] = score
 
-        if not combined:
+        if not points:
             return []
 
-        ranked = sorted(combined.values(), key=lambda item: item['rrf'], reverse=True)
+        candidates: Sequence[int] = range(len(points))
+        if score_threshold is not None:
+            candidates = [
+                idx for idx in candidates
+                if best_scores[idx] is None or best_scores[idx] >= score_threshold
+            ]
+        # Every candidate now passes the threshold, so only the top ``limit`` are
+        # needed; nlargest keeps sorted()'s tie order. At least one is always kept.
+        ranked = heapq.nlargest(max(limit, 1), candidates, key=rrf_scores.__getitem__)
         documents: List[Dict[str, Any]] = []
-        for entry in ranked:
-            point = entry['point']
-            modal_scores = entry['modal_scores']
-            if score_threshold is not None:
-                best_score = None
-                if modal_scores:
-                    with suppress(Exception):
-                        best_score = max(float(v) for v in modal_scores.values())
-                if best_score is None:
-                    best_score = getattr(point, 'score', None)
-                try:
-                    meets_threshold = (best_score is None) or (float(best_score) >= score_threshold)
-                except (TypeError, ValueError):
-                    meets_threshold = True
-                if not meets_threshold:
-                    continue
-            payload = getattr(point, 'payload', {}) or {}
+        for idx in ranked:
+            point = points[idx]
+            modal_scores = modal_by_index[idx]
+            try:
+                payload = point.payload or {}
+            except AttributeError:
+                payload = {}
             if not isinstance(payload, dict):
                 payload = {}
-            metadata = {k: v for k, v in payload.items() if k != 'text'}
+            metadata = payload.copy()
+            metadata.pop('text', None)
             dense_score = modal_scores.get('dense')
             if dense_score is not None:
                 metadata.setdefault('vector_score', dense_score)
-            metadata['hybrid_rrf'] = entry['rrf']
+            metadata['hybrid_rrf'] = rrf_scores[idx]
             metadata['hybrid_scores'] = modal_scores
             metadata['hybrid_weights'] = weights
             documents.append(
                 {
                     'id': point.id,
-                    'score': entry['rrf'],
+                    'score': rrf_scores[idx],
                     'content': payload.get('text', ''),
                     'metadata': metadata,
                 }
             )
-            if len(documents) >= limit:
-                break
         return documents
 
     def search_similar(
@@ -849,113 +1178,154 @@ class VectorService:
         if rrf_k_override is None and hybrid_rrf_k is not None:
             rrf_k_override = hybrid_rrf_k
 
+        bge_future = None
+        dense_future = None
         try:
-            client = self.get_client()
-            collection_name = self._collection_name(project_id)
-            self.create_collection(project_id)
-
-            embedding_usage: Optional[TokenUsage] = None
-            if ai_service is None:
-                from app.services.ai_service import AIService
+            self._ensure_collection(project_id)
+
+            config = self._config()
+            debug_on = self._debug_enabled()
+            query_key = hashlib.sha256(
+                f"{config.get('EMBEDDING_MODEL')}\x00{config.get('EMBEDDING_DIM')}\x00{query_text}".encode('utf-8')
+            ).hexdigest()
+
+            # Encode the lexical/ColBERT query on the pool while the dense embedding is generated.
+            bge_cached = _QUERY_BGE_CACHE.get(query_key)
+            if bge_cached is None:
+                bge_future = _SEARCH_POOL.submit(
+                    self._encode_query_in_context, current_app._get_current_object(), query_text
+                )
 
-                ai_service = AIService()
-            embedding_result = ai_service.generate_embeddings(query_text)
-            if isinstance(embedding_result, tuple):
-                query_embeddings = embedding_result[0]
-                if len(embedding_result) > 1 and isinstance(embedding_result[1], TokenUsage):
-                    embedding_usage = embedding_result[1]
-            else:
-                query_embeddings = embedding_result
+            # Embeddings also depend on the provider, so a caller-supplied ai_service (another
+            # provider, a test stub) never gets vectors cached from a different one.
+            provider = type(ai_service)
+            provider_name = f"{provider.__module__}.{provider.__qualname__}" if ai_service is not None else 'default'
+            embedding_key = f"{provider_name}\x00{query_key}"
+            query_embeddings = _QUERY_EMBEDDING_CACHE.get(embedding_key)
+            if query_embeddings is None:
+                embedding_usage: Optional[TokenUsage] = None
+                if ai_service is None:
+                    from app.services.ai_service import AIService
+
+                    ai_service = AIService()
+                embedding_result = ai_service.generate_embeddings(query_text)
+                if isinstance(embedding_result, tuple):
+                    query_embeddings = embedding_result[0]
+                    if len(embedding_result) > 1 and isinstance(embedding_result[1], TokenUsage):
+                        embedding_usage = embedding_result[1]
+                else:
+                    query_embeddings = embedding_result
 
-            if usage_tracker is not None and embedding_usage is not None:
-                with suppress(Exception):
-                    usage_tracker.track('embedding', embedding_usage)
+                if usage_tracker is not None and embedding_usage is not None:
+                    with suppress(Exception):
+                        usage_tracker.track('embedding', embedding_usage)
 
-            if not query_embeddings:
-                return []
+                if not query_embeddings:
+                    return []
+                _QUERY_EMBEDDING_CACHE.put(embedding_key, query_embeddings)
 
             computed_threshold = self.resolve_score_threshold(score_threshold)
-            search_threshold = None if self._debug_enabled() else computed_threshold
+            search_threshold = None if debug_on else computed_threshold
 
             per_vector_limit = self.resolve_prefetch_limit(limit, prefetch_limit)
             colbert_limit = self.resolve_colbert_candidates(colbert_candidates)
             rrf_k = self.resolve_rrf_k(rrf_k_override)
             weights = self.resolve_rrf_weights(rrf_weight_overrides)
 
-            dense_hits = client.search(
-                collection_name=collection_name,
-                query_vector=models.NamedVector(name='dense', vector=query_embeddings),
+            dense_request = models.QueryRequest(
+                query=query_embeddings,
+                using='dense',
                 limit=per_vector_limit,
                 score_threshold=search_threshold,
                 with_payload=True,
-                with_vectors=False,
-            ) or []
-
-            if dense_hits and self._debug_enabled():
-                self._log_debug_results(dense_hits, computed_threshold, label=(debug_label or 'query') + ' [dense]')
-
-            lexical_vector: Optional[BGESparseVector] = None
-            colbert_vector: Optional[List[float]] = None
-            try:
-                bge_result = self._bge().encode([query_text], return_dense=False, return_colbert_vecs=True)
-                lexical_vector = bge_result.first_sparse()
-                colbert_vector = bge_result.first_colbert_agg()
-            except (BGEClientError, ValueError) as exc:
-                self._logger().warning(
-                    "BGE query failed; continuing with dense-only retrieval",
-                    extra={'event': 'bge_query_failed', 'error': str(exc)}
-                )
-            except Exception as exc:
-                self._logger().error(
-                    "Unexpected error calling BGE service",
-                    extra={'event': 'bge_unexpected_error', 'error': str(exc)}
-                )
+                with_vector=False,
+            )
+            if bge_future is not None and not bge_future.done():
+                # BGE is still encoding; start the dense search instead of waiting to batch it.
+                self.get_client()
+                dense_future = _SEARCH_POOL.submit(self.search_many, project_id, [dense_request])
 
-            lexical_hits: List[Any] = []
-            sparse_query = self._normalize_sparse(lexical_vector)
-            if sparse_query:
+            if bge_cached is None:
                 try:
-                    lexical_hits = client.search(
-                        collection_name=collection_name,
-                        query_vector=models.NamedSparseVector(name='lexical', vector=sparse_query),
-                        limit=per_vector_limit,
-                        score_threshold=search_threshold,
-                        with_payload=True,
-                        with_vectors=False,
-                    ) or []
-                except Exception as exc:
+                    # Cover the client's full retry budget so a retry that would succeed isn't abandoned;
+                    # this only trips when the encode is stuck queued behind a saturated pool.
+                    bge_cached = bge_future.result(timeout=self._bge().max_encode_secs())
+                except FuturesTimeoutError:
+                    # Same as a BGEClientError inside _encode_query: fall back to dense-only.
+                    bge_future.cancel()
                     self._logger().warning(
-                        "Lexical search failed",
-                        extra={'event': 'qdrant_lexical_search_failed', 'error': str(exc)}
+                        "BGE query failed; continuing with dense-only retrieval",
+                        extra={'event': 'bge_query_failed', 'error': 'timed out waiting for BGE encode'}
                     )
-
-            if lexical_hits and self._debug_enabled():
-                self._log_debug_results(lexical_hits, 0.0, label=(debug_label or 'query') + ' [lexical]')
-
-            colbert_hits: List[Any] = []
+                    bge_cached = (None, None)
+                if bge_cached != (None, None):
+                    _QUERY_BGE_CACHE.put(query_key, bge_cached)
+            lexical_vector, colbert_vector = bge_cached
+
+            channel_requests: List[Tuple[str, models.QueryRequest]] = []
+            if dense_future is None:
+                channel_requests.append(('dense', dense_request))
+            sparse_query = self._normalize_sparse(lexical_vector)
+            if sparse_query:
+                channel_requests.append(
+                    (
+                        'lexical',
+                        models.QueryRequest(
+                            query=sparse_query,
+                            using='lexical',
+                            limit=per_vector_limit,
+                            score_threshold=search_threshold,
+                            with_payload=True,
+                            with_vector=False,
+                        ),
+                    )
+                )
             if colbert_vector:
+                channel_requests.append(
+                    (
+                        'colbert',
+                        models.QueryRequest(
+                            query=colbert_vector,
+                            using='colbert',
+                            limit=max(colbert_limit, limit),
+                            score_threshold=search_threshold,
+                            with_payload=True,
+                            with_vector=False,
+                        ),
+                    )
+                )
+
+            channel_hits: Dict[str, List[Any]] = {}
+            if channel_requests:
                 try:
-                    colbert_hits = client.search(
-                        collection_name=collection_name,
-                        query_vector=models.NamedVector(name='colbert', vector=colbert_vector),
-                        limit=max(colbert_limit, limit),
-                        score_threshold=search_threshold,
-                        with_payload=True,
-                        with_vectors=False,
-                    ) or []
+                    channel_hits = self._search_channels(project_id, channel_requests)
                 except Exception as exc:
+                    if dense_future is None:
+                        raise
+                    # Only optional channels were batched here; keep the dense results.
                     self._logger().warning(
-                        "ColBERT search failed",
-                        extra={'event': 'qdrant_colbert_search_failed', 'error': str(exc)}
+                        "Lexical/ColBERT search failed",
+                        extra={'event': 'qdrant_aux_search_failed', 'error': str(exc)}
                     )
-
-            if colbert_hits and self._debug_enabled():
-                self._log_debug_results(colbert_hits, 0.0, label=(debug_label or 'query') + ' [colbert]')
+            if dense_future is not None:
+                channel_hits['dense'] = dense_future.result()[0]
+            dense_hits = channel_hits.get('dense') or []
+            lexical_hits = channel_hits.get('lexical') or []
+            colbert_hits = channel_hits.get('colbert') or []
+
+            if debug_on:
+                base_label = debug_label or 'query'
+                if dense_hits:
+                    self._record_debug_results(dense_hits, computed_threshold, label=base_label + ' [dense]')
+                if lexical_hits:
+                    self._record_debug_results(lexical_hits, 0.0, label=base_label + ' [lexical]')
+                if colbert_hits:
+                    self._record_debug_results(colbert_hits, 0.0, label=base_label + ' [colbert]')
 
             hits_by_channel = {
-                'dense': list(dense_hits or []),
-                'lexical': list(lexical_hits or []),
-                'colbert': list(colbert_hits or []),
+                'dense': dense_hits,
+                'lexical': lexical_hits,
+                'colbert': colbert_hits,
             }
 
             documents = self._rrf_merge(
@@ -982,11 +1352,19 @@ class VectorService:
             return documents
 
         except Exception as exc:
+            # Re-verify the collection on the next search in case it was dropped externally.
+            with suppress(Exception):
+                _ENSURED_COLLECTIONS.discard(self._collection_name(project_id))
             self._logger().error(
                 "Error searching Qdrant vectors",
                 extra={'event': 'qdrant_search_error', 'project_id': project_id, 'error': str(exc)}
             )
             return []
+        finally:
+            # Drop queued pool work nobody will read (early returns, errors); running work finishes on its own.
+            for future in (bge_future, dense_future):
+                if future is not None:
+                    future.cancel()
 
     def check_connectivity(self) -> Tuple[bool, Optional[str]]:
         try:
@@ -1007,6 +1385,9 @@ class VectorService:
             'port': current_app.config.get('QDRANT_PORT'),
         }
         try:
+            client_kwargs = self._client_kwargs()
+            output['transport'] = 'grpc' if client_kwargs.get('prefer_grpc') else 'rest'
+            output['grpc_port'] = client_kwargs.get('grpc_port')
             client = self.get_client()
             from time import time
 
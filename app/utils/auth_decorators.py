@@ -3,29 +3,33 @@ from flask import redirect, url_for, jsonify
 from flask_login import current_user
 
 
+def _current_user_object():
+    """Resolve the ``current_user`` proxy once; ``None`` outside a login context."""
+    try:
+        return current_user._get_current_object()
+    except (AttributeError, RuntimeError):
+        return None
+
+
 def require_admin(view):
     @wraps(view)
     def _wrapped(*args, **kwargs):
-        try:
-            if not getattr(current_user, 'is_authenticated', False):
-                return redirect(url_for('auth.login'))
-            if not (getattr(current_user, 'is_admin', False) or getattr(current_user, 'is_superadmin', False)):
-                return redirect(url_for('main.dashboard'))
-            return view(*args, **kwargs)
-        except Exception:
+        user = _current_user_object()
+        if user is None or not getattr(user, 'is_authenticated', False):
             return redirect(url_for('auth.login'))
+        if not (getattr(user, 'is_admin', False) or getattr(user, 'is_superadmin', False)):
+            return redirect(url_for('main.dashboard'))
+        return view(*args, **kwargs)
     return _wrapped
 
 
 def require_superadmin(view):
     @wraps(view)
     def _wrapped(*args, **kwargs):
-        try:
-            if not getattr(current_user, 'is_authenticated', False):
-                return redirect(url_for('auth.login'))
-            if not getattr(current_user, 'is_superadmin', False):
-                return redirect(url_for('admin.dashboard'))
-            return view(*args, **kwargs)
-        except Exception:
+        user = _current_user_object()
+        if user is None or not getattr(user, 'is_authenticated', False):
             return redirect(url_for('auth.login'))
+        if not getattr(user, 'is_superadmin', False):
+            return redirect(url_for('admin.dashboard'))
+        return view(*args, **kwargs)
     return _wrapped
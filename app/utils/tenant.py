@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 from flask import current_app, request, url_for, g, has_request_context
 
 from .validators import normalize_subdomain
 
 
-@dataclass
+_LOCALHOST_HOSTS = frozenset({'localhost', '127.0.0.1', '::1'})
+
+
+@dataclass(frozen=True)
 class HostResolution:
     host: str
     port: Optional[int]
@@ -47,18 +51,55 @@ def _split_host_port(raw_host: str | None) -> tuple[str, Optional[int]]:
     return host_part.lower(), port_val
 
 
-def resolve_host(raw_host: str | None, config: dict | None = None) -> HostResolution:
-    cfg = config or (current_app.config if current_app else {})
+@dataclass(frozen=True)
+class _TenantConfig:
+    base_domain: Optional[str]
+    admin_subdomain: Optional[str]
+    reserved: frozenset
+    additional_roots: frozenset
+    additional_allowed: frozenset
+
+
+@lru_cache(maxsize=8)
+def _build_tenant_config(
+    primary_domain: str,
+    admin_subdomain: str,
+    reserved_raw: tuple,
+    roots_raw: tuple,
+    allowed_raw: tuple,
+) -> _TenantConfig:
+    admin = admin_subdomain.strip().lower() or None
+    reserved = {s.strip().lower() for s in reserved_raw}
+    if admin:
+        reserved.discard(admin)  # admin handled separately
+    return _TenantConfig(
+        base_domain=primary_domain.lower().strip('.') or None,
+        admin_subdomain=admin,
+        reserved=frozenset(reserved),
+        additional_roots=frozenset(s.strip().lower() for s in roots_raw),
+        additional_allowed=frozenset(allowed_raw),
+    )
+
+
+def _tenant_config(cfg) -> _TenantConfig:
+    # The raw config values double as the cache key, so config changes
+    # (tests, reloads) are picked up without explicit invalidation.
+    return _build_tenant_config(
+        cfg.get('PRIMARY_DOMAIN') or '',
+        cfg.get('ADMIN_SUBDOMAIN') or '',
+        tuple(cfg.get('RESERVED_SUBDOMAINS') or ()),
+        tuple(cfg.get('ADDITIONAL_ROOT_HOSTS') or ()),
+        tuple(cfg.get('ADDITIONAL_ALLOWED_HOSTS') or ()),
+    )
+
+
+@lru_cache(maxsize=4096)
+def _resolve_host_cached(raw_host: str | None, tenant: _TenantConfig) -> HostResolution:
     host, port = _split_host_port(raw_host)
-    base_domain = (cfg.get('PRIMARY_DOMAIN') or '').lower().strip('.') or None
-    admin_subdomain = (cfg.get('ADMIN_SUBDOMAIN') or '').strip().lower() or None
-    reserved = set(s.strip().lower() for s in (cfg.get('RESERVED_SUBDOMAINS') or []))
-    if admin_subdomain:
-        reserved.discard(admin_subdomain)  # admin handled separately
-    localhost_hosts = {'localhost', '127.0.0.1', '::1'}
-    additional_roots = set(s.strip().lower() for s in (cfg.get('ADDITIONAL_ROOT_HOSTS') or []))
-    is_local = host in localhost_hosts
-    is_allowed_alt = host in additional_roots
+    base_domain = tenant.base_domain
+    admin_subdomain = tenant.admin_subdomain
+    is_local = host in _LOCALHOST_HOSTS
+    is_allowed_alt = host in tenant.additional_roots
     slug: Optional[str] = None
     is_primary = False
     is_admin_host = False
@@ -74,14 +115,14 @@ def resolve_host(raw_host: str | None, config: dict | None = None) -> HostResolu
         if admin_subdomain and slug == admin_subdomain:
             is_admin_host = True
             slug = None
-        elif slug in reserved:
+        elif slug in tenant.reserved:
             # treat reserved as primary (no organization)
             slug = None
-    elif host in localhost_hosts:
-        is_local = True
+    elif is_local:
+        pass
     else:
         # host doesn't match base domain; allow only if explicitly whitelisted
-        is_allowed_alt = is_allowed_alt or host in (cfg.get('ADDITIONAL_ALLOWED_HOSTS') or [])
+        is_allowed_alt = is_allowed_alt or host in tenant.additional_allowed
 
     return HostResolution(
         host=host,
@@ -95,6 +136,11 @@ def resolve_host(raw_host: str | None, config: dict | None = None) -> HostResolu
     )
 
 
+def resolve_host(raw_host: str | None, config: dict | None = None) -> HostResolution:
+    cfg = config or (current_app.config if current_app else {})
+    return _resolve_host_cached(raw_host, _tenant_config(cfg))
+
+
 def build_host_for_slug(slug: str | None, *, config: dict | None = None) -> str:
     cfg = config or (current_app.config if current_app else {})
     base_domain = (cfg.get('PRIMARY_DOMAIN') or '').strip()
@@ -108,11 +154,9 @@ def build_host_for_slug(slug: str | None, *, config: dict | None = None) -> str:
     return base_domain
 
 
-def build_external_url(slug: str | None, endpoint: str, *, config: dict | None = None, scheme: Optional[str] = None, **values) -> str:
-    cfg = config or (current_app.config if current_app else {})
-    scheme = scheme or cfg.get('TENANT_URL_SCHEME') or cfg.get('PREFERRED_URL_SCHEME') or 'https'
-    host = build_host_for_slug(slug, config=cfg)
-    path = url_for(endpoint, _external=False, **values)
+def _external_url_parts(cfg) -> tuple[str, Optional[str]]:
+    """Return the default scheme and public port (``None`` for 80/443) for external URLs."""
+    scheme = cfg.get('TENANT_URL_SCHEME') or cfg.get('PREFERRED_URL_SCHEME') or 'https'
     port = None
     if has_request_context():
         host_info = getattr(g, 'tenant_host', None)
@@ -127,14 +171,31 @@ def build_external_url(slug: str | None, endpoint: str, *, config: dict | None =
         # Avoid duplicating standard ports (80/443)
         if port in {'80', '443'}:
             port = None
-    netloc = host
-    if port:
-        netloc = f"{host}:{port}"
-    return f"{scheme}://{netloc}{path}"
+    return scheme, port or None
+
+
+def build_external_url(slug: str | None, endpoint: str, *, config: dict | None = None, scheme: Optional[str] = None, **values) -> str:
+    cfg = config or (current_app.config if current_app else {})
+    if config is None and has_request_context():
+        # Scheme and port only depend on the request and app config; templates
+        # render many tenant links per request, so resolve them once.
+        parts = getattr(g, '_tenant_url_parts', None)
+        if parts is None:
+            parts = g._tenant_url_parts = _external_url_parts(cfg)
+    else:
+        parts = _external_url_parts(cfg)
+    default_scheme, port = parts
+    host = build_host_for_slug(slug, config=cfg)
+    path = url_for(endpoint, _external=False, **values)
+    netloc = f"{host}:{port}" if port else host
+    return "".join((scheme or default_scheme, "://", netloc, path))
 
 
 def current_request_slug() -> Optional[str]:
-    host_info = resolve_host(request.host if request else None)
+    host_info = getattr(g, 'tenant_host', None)
+    if host_info is None:
+        host_info = resolve_host(request.host if request else None)
+        g.tenant_host = host_info
     return host_info.slug
 
 
@@ -4,19 +4,26 @@ import re
 
 
 _SUBDOMAIN_INVALID_CHARS = re.compile(r"[^a-z0-9-]")
-_SUBDOMAIN_VALID_RE = re.compile(r"^(?!-)[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$")
+_SUBDOMAIN_DUP_HYPHEN_RE = re.compile(r"-{2,}")
+_SUBDOMAIN_VALID_RE = re.compile(r"(?!-)[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?", re.ASCII)
 
 
-_CTRL_RE = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]")
-_EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
+_CTRL_TABLE = dict.fromkeys(
+    [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F],
+    ord(" "),
+)
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", re.ASCII)
 
 
 def sanitize_text(value: str | None, *, max_len: int = 5000, strip_ctrl: bool = True) -> str:
     if value is None:
         return ""
     s = str(value)
+    # Printable text has no control characters, so only the strip is needed.
+    if len(s) <= max_len and s.isprintable():
+        return s.strip()
     if strip_ctrl:
-        s = _CTRL_RE.sub(" ", s)
+        s = s.translate(_CTRL_TABLE)
     s = s.strip()
     if len(s) > max_len:
         s = s[:max_len]
@@ -27,7 +34,7 @@ def is_valid_email(value: str | None) -> bool:
     if not value:
         return False
     v = value.strip()
-    return bool(_EMAIL_RE.match(v))
+    return _EMAIL_RE.fullmatch(v) is not None
 
 
 def to_int(value, default: int = 0, *, minimum: int | None = None, maximum: int | None = None) -> int:
@@ -54,7 +61,7 @@ def normalize_subdomain(value: str | None) -> str:
     if not slug:
         return ""
     slug = _SUBDOMAIN_INVALID_CHARS.sub('-', slug)
-    slug = re.sub(r'-{2,}', '-', slug)
+    slug = _SUBDOMAIN_DUP_HYPHEN_RE.sub('-', slug)
     slug = slug.strip('-')
     if len(slug) > 63:
         slug = slug[:63]
@@ -65,4 +72,4 @@ def normalize_subdomain(value: str | None) -> str:
 def is_valid_subdomain(slug: str | None) -> bool:
     if not slug:
         return False
-    return bool(_SUBDOMAIN_VALID_RE.match(slug))
+    return _SUBDOMAIN_VALID_RE.fullmatch(slug) is not None
@@ -1,6 +1,11 @@
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
+import itertools
 import json
+import sys
 import threading
+import time
 from urllib.parse import parse_qs
 try:
     from flask_sock import Sock
@@ -9,21 +14,64 @@ except Exception:  # If dependency missing, noop register
 
 from flask import request, current_app
 from app.models.knowledge_file import KnowledgeFile
-from app.models.project import Project
+from app import db
+from app.models.project import Project, ProjectUser
 from flask_login import current_user
 from itsdangerous import TimestampSigner, BadSignature, SignatureExpired
 
 _sock = None
-_connections_lock = threading.Lock()
-# project_id -> list of connection dicts: {ws, user_id, last_state: {file_id: status_hash}, last_pong: datetime}
+# Striped locks guard each project's connection map; _user_lock guards _user_connections.
+# When both are needed, take _user_lock first.
+_PROJECT_LOCK_STRIPES = 64
+_project_locks = [threading.Lock() for _ in range(_PROJECT_LOCK_STRIPES)]
+_user_lock = threading.Lock()
+# project_id -> {id(record): connection dict}: {ws, user_id, last_state: {file_id: status_hash}, last_pong: datetime}
 _project_connections = {}
 
-# user_id -> list of connection records (subset references from _project_connections) for global/user limiting
+# user_id -> {id(record): record} (subset references from _project_connections) for global/user limiting
 _user_connections = {}
 
+# Compact, reusable encoder for WS frames. Frames stay str: bytes would go out as
+# binary messages, which the browser client does not parse.
+_dumps = json.JSONEncoder(separators=(',', ':'), check_circular=False).encode
+
+# Broadcasts yield to other greenlets after this many sends
+BROADCAST_BATCH_SIZE = 50
+
+# Knowledge updates for a project are coalesced over this window before querying
+BROADCAST_COALESCE_SECS = 0.05
+_pending_lock = threading.Lock()
+# project_id -> set of file ids, or None meaning "all files"
+_pending_file_ids = {}
+_pending_timers = {}
+_NOTHING_PENDING = object()
+
+# Handshake snapshots are reused for this long; broadcast_knowledge_update invalidates them
+SNAPSHOT_CACHE_SECS = 1.0
+# LRU bound on cached snapshots and tracked invalidation versions
+SNAPSHOT_CACHE_MAX = 512
+_snapshot_lock = threading.Lock()
+# project_id -> (monotonic built_at, snapshot list, serialized frame)
+_snapshot_cache = OrderedDict()
+# project_id -> tick of its last invalidation; a snapshot is only stored if its
+# project's version did not move while it was being built. Projects evicted from
+# here fall back to the highest evicted tick, so the version never goes backwards.
+_snapshot_versions = OrderedDict()
+_snapshot_version_floor = 0
+_snapshot_clock = itertools.count(1)
+
+
+def _plock(project_id):
+    return _project_locks[hash(project_id) % _PROJECT_LOCK_STRIPES]
+
+
+@lru_cache(maxsize=4)
+def _signer_for(secret_key):
+    return TimestampSigner(secret_key)
+
 
 def _signer():
-    return TimestampSigner(current_app.config['SECRET_KEY'])
+    return _signer_for(current_app.config['SECRET_KEY'])
 
 
 def _serialize_file(f):
@@ -43,6 +91,10 @@ def register_ws(app):
     if Sock is None:
         return
     _sock = Sock(app)
+    # Connection limits are fixed for the app's lifetime; read them once here
+    max_per_user = int(app.config.get('WS_MAX_CONNECTIONS_PER_USER', 1) or 0)
+    idle_timeout = int(app.config.get('WS_IDLE_TIMEOUT', 90) or 0)
+    receive_timeout = min(idle_timeout, 30) if idle_timeout > 0 else 30
 
     @_sock.route('/ws/knowledge/<project_public_id>')
     def knowledge_status(ws, project_public_id):  # type: ignore
@@ -75,20 +127,26 @@ def register_ws(app):
             finally:
                 return
 
-        project = Project.query.filter_by(public_id=project_public_id).first()
-        if not project or project.id != proj_id or not any(pu.project_id == project.id for pu in getattr(current_user, 'projects', [])):
+        # Project lookup and membership check in one round-trip
+        membership = db.session.query(ProjectUser.id).filter(
+            ProjectUser.project_id == Project.id, ProjectUser.user_id == current_user.id
+        ).exists()
+        row = db.session.query(Project, membership).filter(
+            Project.public_id == project_public_id, Project.id == proj_id
+        ).first()
+        project, is_member = row if row is not None else (None, False)
+        if not is_member:
             print('[WS] Project auth failed, closing')
             try:
                 ws.close()  # type: ignore
             finally:
                 return
 
-        # Prepare initial snapshot
-        files = KnowledgeFile.query.filter_by(project_id=project.id).order_by(KnowledgeFile.uploaded_at.desc()).limit(200).all()
-        snapshot = [_serialize_file(f) for f in files]
+        # Prepare initial snapshot (shared briefly across reconnect storms)
+        snapshot, snapshot_frame = _knowledge_snapshot(project.id)
         try:
             print(f'[WS] Accepted connection for project {project.id}; sending snapshot ({len(snapshot)} files)')
-            ws.send(json.dumps({'type': 'knowledge_snapshot', 'ts': datetime.utcnow().isoformat() + 'Z', 'files': snapshot}))  # type: ignore
+            ws.send(snapshot_frame)  # type: ignore
         except Exception as e:
             print(f'[WS] Failed sending snapshot: {e}; closing')
             try:
@@ -97,91 +155,104 @@ def register_ws(app):
                 return
 
         # Enforce per-user connection limits unless superadmin
-        from flask import current_app as _ca
         is_super = getattr(current_user, 'is_superadmin', False)
-        max_per_user = int(getattr(_ca.config, 'WS_MAX_CONNECTIONS_PER_USER', 1) or 0)
         if not is_super and max_per_user > 0:
-            with _connections_lock:
-                existing = [c for c in _user_connections.get(current_user.id, []) if getattr(c.get('ws'), 'connected', False)]
+            with _user_lock:
+                existing = [c for c in _user_connections.get(current_user.id, {}).values() if getattr(c.get('ws'), 'connected', False)]
                 if len(existing) >= max_per_user:
                     # Strategy: close the oldest existing and allow new one (so refresh works)
-                    oldest = sorted(existing, key=lambda c: c.get('connected_at'))[0]
+                    oldest = min(existing, key=lambda c: c['connected_at'])
                     try:
                         oldest.get('ws').close()  # type: ignore
                     except Exception:
                         pass
                     # Clean after closing
-                    for lst in _project_connections.values():
-                        for rec in list(lst):
-                            if rec is oldest:
-                                lst.remove(rec)
-                    _user_connections[current_user.id] = [c for c in existing if c is not oldest]
+                    with _plock(oldest.get('project_id')):
+                        _project_connections.get(oldest.get('project_id'), {}).pop(id(oldest), None)
+                    _user_connections[current_user.id] = {id(c): c for c in existing if c is not oldest}
         conn_record = {
             'ws': ws,
             'project_id': project.id,
             'user_id': current_user.id,
             'last_state': {f['id']: _file_state_hash(f) for f in snapshot},
             'last_pong': datetime.utcnow(),
-            'connected_at': datetime.utcnow()
+            'connected_at': time.monotonic()  # only compared between records
         }
-        with _connections_lock:
-            _project_connections.setdefault(project.id, []).append(conn_record)
-            _user_connections.setdefault(current_user.id, []).append(conn_record)
+        with _user_lock:
+            _user_connections.setdefault(current_user.id, {})[id(conn_record)] = conn_record
+        with _plock(project.id):
+            _project_connections.setdefault(project.id, {})[id(conn_record)] = conn_record
 
-        # Keep the socket open; wait for client pings; terminate on error/close
+        # Keep the socket open; wait for client pings; terminate on error/close.
+        # We emulate heartbeat by expecting client JSON {"type": "ping"}; receive blocks
+        # until a message arrives or the timeout elapses, so idle sockets cost no wakeups.
         while True:
             try:
                 if not ws.connected:  # type: ignore
                     break
-                # Receive non-blocking small control messages (pings)
-                import time
-                # Try a short receive with timeout using underlying simple-websocket (ws.receive blocks). Use polling period.
-                # We'll emulate heartbeat by expecting client JSON {"type": "ping"}
-                try:
-                    ws.sock.settimeout(0.1)  # type: ignore
-                except Exception:
-                    pass
-                msg = None
                 try:
-                    msg = ws.receive(timeout=0.1)  # type: ignore
+                    msg = ws.receive(timeout=receive_timeout)  # type: ignore
                 except TypeError:
-                    # Older flask-sock/simple-websocket versions don't support timeout kw; fallback to non-blocking pattern
-                    try:
-                        msg = ws.receive()  # type: ignore
-                    except Exception:
-                        msg = None
-                except Exception:
-                    msg = None
+                    # Older flask-sock/simple-websocket versions don't support timeout kw; block until a message
+                    msg = ws.receive()  # type: ignore
                 if msg:
                     try:
                         data = json.loads(msg)
                         if isinstance(data, dict) and data.get('type') == 'ping':
-                            conn_record['last_pong'] = datetime.utcnow()
+                            now = datetime.utcnow()
+                            conn_record['last_pong'] = now
                             try:
-                                ws.send(json.dumps({'type': 'pong', 'ts': datetime.utcnow().isoformat() + 'Z'}))  # type: ignore
+                                ws.send(_dumps({'type': 'pong', 'ts': now.isoformat() + 'Z'}))  # type: ignore
                             except Exception:
                                 pass
                     except Exception:
                         pass
                 # Idle timeout check
-                idle_timeout = int(getattr(_ca.config, 'WS_IDLE_TIMEOUT', 90) or 0)
                 if idle_timeout > 0:
                     if (datetime.utcnow() - conn_record['last_pong']).total_seconds() > idle_timeout:
                         try:
                             ws.close()  # type: ignore
                         finally:
                             break
-                time.sleep(5)
             except Exception:
+                # receive raises ConnectionClosed once the peer goes away
                 break
         # Cleanup
         print(f'[WS] Connection closing for project {project.id}')
-        with _connections_lock:
-            lst = _project_connections.get(project.id, [])
-            _project_connections[project.id] = [c for c in lst if c is not conn_record]
-            # Remove from user connections
-            ulist = _user_connections.get(conn_record.get('user_id'), [])
-            _user_connections[conn_record.get('user_id')] = [c for c in ulist if c is not conn_record]
+        _drop_connection(conn_record)
+
+
+def _knowledge_snapshot(project_id):
+    """Return (snapshot, frame) for a project, reusing one built in the last SNAPSHOT_CACHE_SECS."""
+    now = time.monotonic()
+    with _snapshot_lock:
+        cached = _snapshot_cache.get(project_id)
+        if cached is not None and now - cached[0] < SNAPSHOT_CACHE_SECS:
+            _snapshot_cache.move_to_end(project_id)
+            return cached[1], cached[2]
+        version = _snapshot_versions.get(project_id, _snapshot_version_floor)
+    files = KnowledgeFile.query.filter_by(project_id=project_id).order_by(KnowledgeFile.uploaded_at.desc()).limit(200).all()
+    snapshot = [_serialize_file(f) for f in files]
+    frame = _dumps({'type': 'knowledge_snapshot', 'ts': datetime.utcnow().isoformat() + 'Z', 'files': snapshot})
+    with _snapshot_lock:
+        # A broadcast during the query may have seen an older row; don't cache it
+        if _snapshot_versions.get(project_id, _snapshot_version_floor) == version:
+            _snapshot_cache[project_id] = (now, snapshot, frame)
+            _snapshot_cache.move_to_end(project_id)
+            while len(_snapshot_cache) > SNAPSHOT_CACHE_MAX:
+                _snapshot_cache.popitem(last=False)
+    return snapshot, frame
+
+
+def _invalidate_snapshot(project_id):
+    global _snapshot_version_floor
+    with _snapshot_lock:
+        _snapshot_cache.pop(project_id, None)
+        _snapshot_versions[project_id] = next(_snapshot_clock)
+        _snapshot_versions.move_to_end(project_id)
+        while len(_snapshot_versions) > SNAPSHOT_CACHE_MAX:
+            _, evicted = _snapshot_versions.popitem(last=False)
+            _snapshot_version_floor = max(_snapshot_version_floor, evicted)
 
 
 def _file_state_hash(fdict):
@@ -189,45 +260,109 @@ def _file_state_hash(fdict):
     return f"{fdict['status']}|{fdict.get('error_message') or ''}|{fdict.get('chunks_count') or 0}"
 
 
+def _drop_connection(conn_record):
+    """Forget a connection record (idempotent; the socket loop also cleans up on exit)."""
+    key = id(conn_record)
+    with _user_lock:
+        _user_connections.get(conn_record.get('user_id'), {}).pop(key, None)
+    project_id = conn_record.get('project_id')
+    with _plock(project_id):
+        _project_connections.get(project_id, {}).pop(key, None)
+
+
+def _cooperative_yield():
+    """Let other greenlets run between broadcast batches (plain thread yield otherwise)."""
+    gevent = sys.modules.get('gevent')
+    if gevent is not None:
+        gevent.sleep(0)
+    else:
+        time.sleep(0)
+
+
 def broadcast_knowledge_update(project_id, file_ids=None):
     """Send delta updates for specified files (or all) to connected clients of a project.
     Safe to call best-effort from background threads.
+
+    Calls for the same project within BROADCAST_COALESCE_SECS are merged into a
+    single query and broadcast, so bulk ingestion doesn't fan out per file.
     """
     if Sock is None:
         return
-    with current_app.app_context():
-        q = KnowledgeFile.query.filter_by(project_id=project_id)
-        if file_ids:
-            if not isinstance(file_ids, (list, tuple, set)):
-                file_ids = [file_ids]
-            q = q.filter(KnowledgeFile.id.in_(file_ids))
-        changed_files = [_serialize_file(f) for f in q.all()]
+    # Any file change invalidates the cached handshake snapshot, viewers or not
+    _invalidate_snapshot(project_id)
+    with _plock(project_id):
+        if not _project_connections.get(project_id):
+            return
+    if file_ids and not isinstance(file_ids, (list, tuple, set)):
+        file_ids = [file_ids]
+    app = current_app._get_current_object()
+    with _pending_lock:
+        if not file_ids:
+            _pending_file_ids[project_id] = None  # None = all files
+        else:
+            pending = _pending_file_ids.get(project_id, _NOTHING_PENDING)
+            if pending is _NOTHING_PENDING:
+                _pending_file_ids[project_id] = set(file_ids)
+            elif pending is not None:
+                pending.update(file_ids)
+        if project_id in _pending_timers:
+            return
+        timer = threading.Timer(BROADCAST_COALESCE_SECS, _flush_knowledge_update, args=(app, project_id))
+        timer.daemon = True
+        _pending_timers[project_id] = timer
+    timer.start()
+
+
+def _flush_knowledge_update(app, project_id):
+    with _pending_lock:
+        _pending_timers.pop(project_id, None)
+        file_ids = _pending_file_ids.pop(project_id, None)
+    try:
+        with app.app_context():
+            _send_knowledge_update(project_id, file_ids)
+    except Exception as e:
+        print(f'[WS] Knowledge broadcast failed for project {project_id}: {e}')
+
+
+def _send_knowledge_update(project_id, file_ids):
+    q = KnowledgeFile.query.filter_by(project_id=project_id)
+    if file_ids:
+        q = q.filter(KnowledgeFile.id.in_(file_ids))
+    changed_files = [_serialize_file(f) for f in q.all()]
     if not changed_files:
         return
-    with _connections_lock:
-        conns = list(_project_connections.get(project_id, []))
+    with _plock(project_id):
+        conns = list(_project_connections.get(project_id, {}).values())
     if not conns:
         return
-    for conn in conns:
+    # State hashes and serialized frames are computed once per broadcast; clients
+    # that need the same subset of files (the common case) share one frame.
+    ts = datetime.utcnow().isoformat() + 'Z'
+    hashes = [(f, f['id'], _file_state_hash(f)) for f in changed_files]
+    frames = {}
+    for i, conn in enumerate(conns):
+        if i and i % BROADCAST_BATCH_SIZE == 0:
+            _cooperative_yield()
         ws = conn.get('ws')
-        if not getattr(ws, 'connected', False):  # type: ignore
-            continue
-        deltas = []
+        needed = []
         last_state = conn.get('last_state', {})
-        for f in changed_files:
-            h = _file_state_hash(f)
-            fid = f['id']
+        for f, fid, h in hashes:
             if last_state.get(fid) != h:  # changed
-                deltas.append(f)
+                needed.append(fid)
                 last_state[fid] = h
-        if not deltas:
+        if not needed:
             continue
-        payload = {'type': 'knowledge_delta', 'ts': datetime.utcnow().isoformat() + 'Z', 'files': deltas}
+        key = tuple(needed)
+        frame = frames.get(key)
+        if frame is None:
+            needed_ids = set(needed)
+            deltas = [f for f, fid, _ in hashes if fid in needed_ids]
+            frame = frames[key] = _dumps({'type': 'knowledge_delta', 'ts': ts, 'files': deltas})
         try:
-            ws.send(json.dumps(payload))  # type: ignore
+            ws.send(frame)  # type: ignore
         except Exception:
-            # Mark connection as stale; cleanup will happen in its loop or future broadcast
-            continue
+            # Closed sockets raise on send; prune them now instead of checking liveness up front
+            _drop_connection(conn)
 
 def broadcast_project_usage(project_id, fragments_used=None, tokens_used=None):
     """Broadcast project usage metrics (fragments/tokens) to all project WS clients.
@@ -235,8 +370,8 @@ def broadcast_project_usage(project_id, fragments_used=None, tokens_used=None):
     """
     if Sock is None:
         return
-    with _connections_lock:
-        conns = list(_project_connections.get(project_id, []))
+    with _plock(project_id):
+        conns = list(_project_connections.get(project_id, {}).values())
     if not conns:
         return
     payload = {
@@ -246,11 +381,12 @@ def broadcast_project_usage(project_id, fragments_used=None, tokens_used=None):
         'fragments_used': fragments_used,
         'tokens_used': tokens_used
     }
-    for conn in conns:
+    frame = _dumps(payload)
+    for i, conn in enumerate(conns):
+        if i and i % BROADCAST_BATCH_SIZE == 0:
+            _cooperative_yield()
         ws = conn.get('ws')
-        if not getattr(ws, 'connected', False):  # type: ignore
-            continue
         try:
-            ws.send(json.dumps(payload))  # type: ignore
+            ws.send(frame)  # type: ignore
         except Exception:
-            continue
+            _drop_connection(conn)
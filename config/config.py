@@ -81,6 +81,10 @@ class Config:
     QDRANT_PORT = _env_int('QDRANT_PORT', 6333)
     QDRANT_ALLOW_INSECURE_FALLBACK = _env_bool('QDRANT_ALLOW_INSECURE_FALLBACK', False)
     QDRANT_DEBUG = _env_bool('QDRANT_DEBUG', False)
+    # Opt-in: grpcio must be made gevent-aware (see wsgi.py) and port 6334 reachable
+    QDRANT_PREFER_GRPC = _env_bool('QDRANT_PREFER_GRPC', False)
+    QDRANT_GRPC_PORT = _env_int('QDRANT_GRPC_PORT', 6334)
+    QDRANT_POOL_SIZE = _env_int('QDRANT_POOL_SIZE', 64)
     
     # --- BGE-M3 Embeddings Service ---
     BGE_M3_BASE_URL = _env_str('BGE_M3_BASE_URL', 'http://bge_m3:8000')
@@ -147,11 +151,13 @@ class Config:
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = _env_str('TEST_DATABASE_URL', 'sqlite:///:memory:')
+    # In-process SQLite shared through one StaticPool connection; the options are
+    # SQLite-only, so a TEST_DATABASE_URL pointing elsewhere uses engine defaults.
+    SQLALCHEMY_DATABASE_URI = _env_str('TEST_DATABASE_URL', 'sqlite://')
     SQLALCHEMY_ENGINE_OPTIONS = {
         'connect_args': {'check_same_thread': False},
         'poolclass': StaticPool,
-    }
+    } if SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {}
     WTF_CSRF_ENABLED = False
     SERVER_NAME = 'localhost'
     RATELIMIT_STORAGE_URI = 'memory://'
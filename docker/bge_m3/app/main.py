@@ -1,13 +1,15 @@
 from __future__ import annotations
 
+import base64
 import hashlib
 import logging
 import os
 from functools import lru_cache
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
 
 import numpy as np
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
 try:
@@ -71,6 +73,10 @@ class EncodeRequest(BaseModel):
     return_dense: bool = Field(default=True, description="Include dense embeddings in the response")
     return_sparse: bool = Field(default=True, description="Include sparse embeddings (indices & values)")
     return_colbert_vecs: bool = Field(default=False, description="Include token-level ColBERT vectors")
+    dense_precision: Literal["fp32", "fp16", "int8"] = Field(
+        default="fp32",
+        description="fp32 returns 'dense' as float lists; fp16/int8 return base64 buffers in 'dense_encoded'",
+    )
 
 
 class SparseVector(BaseModel):
@@ -85,6 +91,10 @@ class LexicalVector(BaseModel):
 
 class EncodeResponse(BaseModel):
     dense: Optional[List[List[float]]] = None
+    dense_encoded: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Quantized dense vectors: base64 little-endian buffer with dtype, shape and per-row scales (int8)",
+    )
     lexical_sparse: Optional[List[SparseVector]] = Field(
         default=None, description="Sparse lexical embeddings with hashed token indices"
     )
@@ -100,9 +110,10 @@ class EncodeResponse(BaseModel):
 @lru_cache(maxsize=32_768)
 def _hash_token(token: str) -> int:
     digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
-    value = int.from_bytes(digest, "big", signed=False)
-    # Limit to uint32 range to comply with Qdrant sparse index expectations
-    return value % (2**32)
+    # Limit to uint32 range to comply with Qdrant sparse index expectations. The low
+    # four bytes of the big-endian digest equal ``value % 2**32`` without the bigint.
+    # The hash itself must stay blake2b: stored sparse vectors are indexed by it.
+    return int.from_bytes(digest[4:], "big")
 
 
 def _lexical_to_sparse(
@@ -122,24 +133,23 @@ def _lexical_to_sparse(
         if not isinstance(row, dict):
             continue
         tokens = list(row.keys())
-        hashed_pairs: List[Tuple[int, float, str]] = []
-        for token in tokens:
-            weight = float(row[token])
-            hashed_pairs.append((_hash_token(token), weight, token))
-        hashed_pairs.sort(key=lambda item: item[0])
-        indices = [idx for idx, _, _ in hashed_pairs]
-        sorted_values = [weight for _, weight, _ in hashed_pairs]
-        sorted_tokens = [token for _, _, token in hashed_pairs]
+        count = len(tokens)
+        hashed = np.fromiter((_hash_token(token) for token in tokens), dtype=np.uint32, count=count)
+        weights = np.fromiter((row[token] for token in tokens), dtype=np.float64, count=count)
+        # Stable sort keeps insertion order for colliding hashes, like list.sort did
+        order = np.argsort(hashed, kind="stable")
+        indices = hashed[order].tolist()
+        sorted_values = weights[order].tolist()
         sparse_vectors.append(SparseVector(indices=indices, values=sorted_values))
         if len(metadata["token_preview"]) < 3:
             preview_row = [
                 {
-                    "token": token,
-                    "hash": hashed,
+                    "token": tokens[pos],
+                    "hash": hash_value,
                     "weight": weight,
                 }
-                for token, hashed, weight in zip(
-                    sorted_tokens[:5], indices[:5], sorted_values[:5]
+                for pos, hash_value, weight in zip(
+                    order[:5].tolist(), indices[:5], sorted_values[:5]
                 )
             ]
             metadata["token_preview"].append(preview_row)
@@ -149,25 +159,89 @@ def _lexical_to_sparse(
 
 
 def _aggregate_colbert(colbert_vecs: Sequence[Sequence[Sequence[float]]]) -> List[List[float]]:
+    # FP32 matches the model output, so pooling never widens to FP64
+    mats = [np.asarray(token_matrix, dtype=np.float32) for token_matrix in colbert_vecs]
+    if not mats:
+        return []
+    if all(mat.ndim == 2 and mat.shape == mats[0].shape and mat.size for mat in mats):
+        # Equal-length sentences pool in a single reduction over the stacked tensor
+        # Max pooling across token dimension emulates late interaction (MaxSim)
+        return np.stack(mats).max(axis=1).tolist()
     aggregated: List[List[float]] = []
-    for token_matrix in colbert_vecs:
-        if not token_matrix:
+    for mat in mats:
+        if mat.size == 0:
             aggregated.append([])
             continue
-        mat = np.asarray(token_matrix, dtype=float)
-        # Max pooling across token dimension emulates late interaction (MaxSim)
-        pooled = np.max(mat, axis=0)
-        aggregated.append(pooled.tolist())
+        aggregated.append(mat.max(axis=0).tolist())
     return aggregated
 
 
-def _head_tail(values: Sequence[Any] | None, size: int = 3) -> Dict[str, List[Any]]:
-    seq = list(values) if values is not None else []
-    if not seq:
+def _quantize_dense(dense: np.ndarray, precision: str) -> Dict[str, Any]:
+    """Pack dense vectors into a base64 fp16 or int8 (per-row absmax scale) buffer."""
+    mat = np.atleast_2d(np.asarray(dense, dtype=np.float32))
+    encoded: Dict[str, Any] = {"dtype": precision, "shape": list(mat.shape)}
+    if precision == "int8":
+        scales = np.abs(mat).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.round(mat / scales[:, None]).astype("<i1")
+        encoded["scales"] = scales.astype(float).tolist()
+    else:
+        data = mat.astype("<f2")
+    encoded["data"] = base64.b64encode(data.tobytes()).decode("ascii")
+    return encoded
+
+
+def _head_tail(values: Sequence[Any] | np.ndarray | None, size: int = 3) -> Dict[str, List[Any]]:
+    # Slice first so only the head/tail elements are converted, not the whole row
+    if values is None or len(values) == 0:
         return {"head": [], "tail": []}
-    head = seq[:size]
-    tail = seq[-size:] if len(seq) > size else seq[:]
-    return {"head": head, "tail": tail}
+    head = values[:size]
+    tail = values[-size:] if len(values) > size else values[:]
+    if isinstance(values, np.ndarray):
+        return {"head": head.tolist(), "tail": tail.tolist()}
+    return {"head": list(head), "tail": list(tail)}
+
+
+def _log_encode_summary(
+    payload: EncodeRequest,
+    dense_arr: Optional[np.ndarray],
+    lexical_vectors: List[SparseVector],
+    colbert_arrays: List[np.ndarray],
+    colbert_agg: Optional[List[List[float]]],
+) -> None:
+    """Log head/tail samples of each output, read straight from the numpy arrays."""
+    try:
+        dense_sample = dense_arr[0] if dense_arr is not None and len(dense_arr) else None
+        lexical_sample = lexical_vectors[0] if lexical_vectors else None
+        colbert_sample = colbert_agg[0] if colbert_agg else []
+        summary: Dict[str, Any] = {
+            "sentences": len(payload.sentences),
+            "dense": {
+                "count": len(dense_arr) if dense_arr is not None else 0,
+                "dim": len(dense_sample) if dense_sample is not None else 0,
+                **_head_tail(dense_sample),
+            },
+            "lexical": {
+                "count": len(lexical_vectors),
+                "non_empty": len(lexical_vectors),
+                "indices": _head_tail(lexical_sample.indices if lexical_sample else []),
+                "values": _head_tail(lexical_sample.values if lexical_sample else []),
+            },
+            "colbert_agg": {
+                "count": len(colbert_agg or []),
+                "dim": len(colbert_sample) if colbert_sample else 0,
+                **_head_tail(colbert_sample),
+            },
+        }
+        if colbert_arrays:
+            first_colbert = colbert_arrays[0]
+            summary["colbert_tokens"] = {
+                "token_rows": first_colbert.shape[0] if first_colbert.ndim else 0,
+                "token_dim": first_colbert.shape[1] if first_colbert.ndim == 2 else 0,
+            }
+        logger.info("Encode output summary: %s", summary, extra={"event": "bge_encode_summary"})
+    except Exception:  # pragma: no cover - logging best-effort
+        logger.debug("Failed to summarise encode output", exc_info=True)
 
 
 @app.get("/healthz", tags=["health"])
@@ -177,7 +251,7 @@ def healthcheck() -> dict[str, str]:
 
 
 @app.post("/encode", response_model=EncodeResponse, tags=["encode"])
-def encode(payload: EncodeRequest) -> EncodeResponse:
+def encode(payload: EncodeRequest) -> JSONResponse:
     if not payload.sentences:
         raise HTTPException(status_code=400, detail="'sentences' must contain at least one element")
 
@@ -192,74 +266,63 @@ def encode(payload: EncodeRequest) -> EncodeResponse:
         logger.exception("Model encoding failed")
         raise HTTPException(status_code=500, detail=f"Model encoding failed: {exc}") from exc
 
-    response = EncodeResponse()
-
+    dense_arr: Optional[np.ndarray] = None
+    dense_payload: Optional[List[List[float]]] = None
+    dense_encoded: Optional[Dict[str, Any]] = None
     if payload.return_dense:
         dense_vecs = result.get("dense_vecs")
         if dense_vecs is not None:
-            response.dense = np.asarray(dense_vecs).astype(float).tolist()
+            # Model output is already float32 (or fp16); tolist() yields the same
+            # Python floats as the old FP64 cast without the widened copy.
+            dense_arr = np.asarray(dense_vecs, dtype=np.float32)
+            if payload.dense_precision == "fp32":
+                dense_payload = dense_arr.tolist()
+            else:
+                dense_encoded = _quantize_dense(dense_arr, payload.dense_precision)
 
     lexical_meta: Dict[str, Any] = {}
     lexical_vectors: List[SparseVector] = []
     if payload.return_sparse:
         lexical_raw = result.get("lexical_weights")
         lexical_vectors, lexical_meta = _lexical_to_sparse(lexical_raw)
-        response.lexical_sparse = lexical_vectors if lexical_vectors else None
     else:
         lexical_meta["requested"] = False
 
+    colbert_arrays: List[np.ndarray] = []
+    colbert_payload: Optional[List[List[List[float]]]] = None
+    colbert_agg: Optional[List[List[float]]] = None
     if payload.return_colbert_vecs:
         colbert_vecs = result.get("colbert_vecs")
         if colbert_vecs is not None:
-            colbert_payload: List[List[List[float]]] = []
-            for sentence_vec in colbert_vecs:
-                arr = np.asarray(sentence_vec).astype(float)
-                colbert_payload.append(arr.tolist())
-            response.colbert = colbert_payload
+            colbert_arrays = [np.asarray(sentence_vec, dtype=np.float32) for sentence_vec in colbert_vecs]
+            colbert_payload = [arr.tolist() for arr in colbert_arrays]
 
             try:
-                response.colbert_agg = _aggregate_colbert(colbert_payload)
+                # Pool the arrays we already hold rather than re-parsing the lists
+                colbert_agg = _aggregate_colbert(colbert_arrays)
             except Exception as exc:  # pragma: no cover
                 logger.warning("Failed to aggregate ColBERT vectors: %s", exc)
 
-    response.meta = {
+    meta = {
         "lexical": lexical_meta,
-        "dense_count": len(response.dense or []),
-        "colbert_count": len(response.colbert or []),
-        "lexical_non_empty": len(response.lexical_sparse or []),
+        "dense_count": dense_encoded["shape"][0] if dense_encoded else len(dense_payload or []),
+        "colbert_count": len(colbert_payload or []),
+        "lexical_non_empty": len(lexical_vectors),
     }
 
-    try:
-        dense_sample = response.dense[0] if response.dense else []
-        lexical_sample = lexical_vectors[0] if lexical_vectors else None
-        colbert_sample = response.colbert_agg[0] if response.colbert_agg else []
-        summary: Dict[str, Any] = {
-            "sentences": len(payload.sentences),
-            "dense": {
-                "count": len(response.dense or []),
-                "dim": len(dense_sample) if dense_sample else 0,
-                **_head_tail(dense_sample),
-            },
-            "lexical": {
-                "count": len(lexical_vectors),
-                "non_empty": len(response.lexical_sparse or []),
-                "indices": _head_tail(lexical_sample.indices if lexical_sample else []),
-                "values": _head_tail(lexical_sample.values if lexical_sample else []),
-            },
-            "colbert_agg": {
-                "count": len(response.colbert_agg or []),
-                "dim": len(colbert_sample) if colbert_sample else 0,
-                **_head_tail(colbert_sample),
-            },
+    if logger.isEnabledFor(logging.INFO):
+        _log_encode_summary(payload, dense_arr, lexical_vectors, colbert_arrays, colbert_agg)
+
+    # Returned as a plain JSONResponse: the vectors are already JSON-native lists, so
+    # re-validating tens of thousands of floats through EncodeResponse is skipped.
+    # The response_model on the route still documents the schema.
+    return JSONResponse(
+        {
+            "dense": dense_payload,
+            "dense_encoded": dense_encoded,
+            "lexical_sparse": [vec.model_dump() for vec in lexical_vectors] or None,
+            "colbert": colbert_payload,
+            "colbert_agg": colbert_agg,
+            "meta": meta,
         }
-        if response.colbert:
-            first_colbert = response.colbert[0]
-            summary["colbert_tokens"] = {
-                "token_rows": len(first_colbert or []),
-                "token_dim": len(first_colbert[0]) if first_colbert else 0,
-            }
-        logger.info("Encode output summary: %s", summary, extra={"event": "bge_encode_summary"})
-    except Exception:  # pragma: no cover - logging best-effort
-        logger.debug("Failed to summarise encode output", exc_info=True)
-
-    return response
+    )
@@ -124,14 +124,24 @@ def make_shell_context():
     }
 
 if __name__ == '__main__':
+    from datetime import datetime
     from sqlalchemy import text, inspect
+    from werkzeug.security import generate_password_hash
     from flask import current_app
     from app.utils.validators import normalize_subdomain, is_valid_subdomain
     from app.utils.tenant import is_reserved_subdomain
 
+    # Bytes map straight onto the alphabet via translate(); bytes past the last full
+    # multiple of the alphabet size are deleted so every character stays equally likely.
+    _PASSWORD_ALPHABET = (string.ascii_letters + string.digits + "!@#$%^&*()_-+=").encode('ascii')
+    _PASSWORD_TABLE = bytes(_PASSWORD_ALPHABET[i % len(_PASSWORD_ALPHABET)] for i in range(256))
+    _PASSWORD_REJECT = bytes(range(256 - 256 % len(_PASSWORD_ALPHABET), 256))
+
     def _gen_password(length=20):
-        alphabet = string.ascii_letters + string.digits + "!@#$%^&*()_-+="
-        return ''.join(secrets.choice(alphabet) for _ in range(length))
+        out = b''
+        while len(out) < length:
+            out += secrets.token_bytes(length * 2).translate(_PASSWORD_TABLE, _PASSWORD_REJECT)
+        return out[:length].decode('ascii')
 
     with app.app_context():
         print('[init] Starting one-time initialization...')
@@ -172,87 +182,111 @@ if __name__ == '__main__':
             except Exception:
                 current_app.logger.exception('[init] Unable to read or apply scripts/init_db.sql')
 
-        # Ensure RLS session allows bootstrap user creation
-        try:
-            db.session.execute(text("SELECT set_config('app.is_superadmin','1', true)"))
-            db.session.execute(text("SELECT set_config('app.org_id','', true)"))
-        except Exception:
-            pass
-
         # --- Lightweight schema upgrades (idempotent) ---
         # Email monitoring tables removed (processed_email, email_account - feature deleted)
 
         # Ensure generation_history table exists (for activity UI)
-        try:
-            db.session.execute(text(
-                """
-                CREATE TABLE IF NOT EXISTS generation_history (
-                    id SERIAL PRIMARY KEY,
-                    project_id INTEGER NOT NULL REFERENCES project(id) ON DELETE CASCADE,
-                    project_name VARCHAR(120) NOT NULL,
-                    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (now() AT TIME ZONE 'utc'),
-                    source_kind VARCHAR(20) NOT NULL,
-                    source_address VARCHAR(255),
-                    source_user VARCHAR(255),
-                    total_tokens INTEGER DEFAULT 0,
-                    title VARCHAR(255) NOT NULL,
-                    response_body TEXT NOT NULL,
-                    chunk_refs JSON,
-                    spam_flag BOOLEAN,
-                    importance_level VARCHAR(32)
-                );
-                """
-            ))
-            db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_generation_history_project ON generation_history(project_id)"))
-            db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_generation_history_created ON generation_history(created_at)"))
-            db.session.commit()
-            print('[init] Ensured generation_history table exists')
-        except Exception:
-            db.session.rollback()
-            current_app.logger.exception('[init] generation_history ensure failed (non-fatal)')
+        def _ensure_generation_history():
+            try:
+                db.session.execute(text(
+                    """
+                    CREATE TABLE IF NOT EXISTS generation_history (
+                        id SERIAL PRIMARY KEY,
+                        project_id INTEGER NOT NULL REFERENCES project(id) ON DELETE CASCADE,
+                        project_name VARCHAR(120) NOT NULL,
+                        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (now() AT TIME ZONE 'utc'),
+                        source_kind VARCHAR(20) NOT NULL,
+                        source_address VARCHAR(255),
+                        source_user VARCHAR(255),
+                        total_tokens INTEGER DEFAULT 0,
+                        title VARCHAR(255) NOT NULL,
+                        response_body TEXT NOT NULL,
+                        chunk_refs JSON,
+                        spam_flag BOOLEAN,
+                        importance_level VARCHAR(32)
+                    );
+                    """
+                ))
+                db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_generation_history_project ON generation_history(project_id)"))
+                db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_generation_history_created ON generation_history(created_at)"))
+                db.session.commit()
+                print('[init] Ensured generation_history table exists')
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception('[init] generation_history ensure failed (non-fatal)')
 
         # Upgrade password_hash column length if still at 128 (older schema)
-        try:
-            current_len = db.session.execute(text(
-                """
-                SELECT character_maximum_length
-                FROM information_schema.columns
-                WHERE table_schema='public' AND table_name='user' AND column_name='password_hash'
-                """
-            )).scalar()
-            if current_len is not None and current_len < 255:
-                db.session.execute(text('ALTER TABLE public."user" ALTER COLUMN password_hash TYPE VARCHAR(255);'))
-                db.session.commit()
-                print('[init] Upgraded password_hash column length to 255')
-        except Exception:
-            db.session.rollback()
-            current_app.logger.exception('[init] password_hash column upgrade failed (non-fatal)')
+        def _upgrade_password_hash_column():
+            try:
+                # pg_attribute directly (indexed) rather than the information_schema view;
+                # atttypmod is length + 4 for varchar, -1 when unbounded (-> NULL, no upgrade).
+                current_len = db.session.execute(text(
+                    """
+                    SELECT CASE WHEN a.atttypmod > 4 THEN a.atttypmod - 4 END
+                    FROM pg_attribute a
+                    WHERE a.attrelid = to_regclass('public."user"')
+                      AND a.attname = 'password_hash' AND NOT a.attisdropped
+                    """
+                )).scalar()
+                if current_len is not None and current_len < 255:
+                    db.session.execute(text('ALTER TABLE public."user" ALTER COLUMN password_hash TYPE VARCHAR(255);'))
+                    db.session.commit()
+                    print('[init] Upgraded password_hash column length to 255')
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception('[init] password_hash column upgrade failed (non-fatal)')
 
         # Create superadmin user if not exists (from ENV if provided)
-        try:
-            admin = User.query.filter_by(is_superadmin=True).first()
-            if not admin:
-                email = os.environ.get('SUPERADMIN_EMAIL', 'admin@company.com')
-                username = os.environ.get('SUPERADMIN_USERNAME', 'admin')
-                password = os.environ.get('SUPERADMIN_PASSWORD') or _gen_password()
-                admin = User(
-                    username=username,
-                    email=email,
-                    is_admin=True,
-                    is_superadmin=True
-                )
-                admin.set_password(password)
-                db.session.add(admin)
-                db.session.commit()
-                print('[init] Superadmin created:')
-                print(f'       username: {username}')
-                print(f'       email   : {email}')
-                print(f'       password: {password}')
-                print('       IMPORTANT: Change this password immediately in user profile.')
-            else:
-                print('[init] Superadmin already exists — skipping creation')
-        except Exception:
-            current_app.logger.exception('[init] Failed to create or verify superadmin user')
+        def _ensure_superadmin():
+            # Ensure RLS session allows bootstrap user creation (transaction-local)
+            try:
+                db.session.execute(text("SELECT set_config('app.is_superadmin','1', true)"))
+                db.session.execute(text("SELECT set_config('app.org_id','', true)"))
+            except Exception:
+                pass
+            try:
+                # The existence probe keeps warm starts from paying for a password hash;
+                # the guarded INSERT stays correct if another init run races us.
+                created_id = None
+                has_admin = db.session.execute(
+                    text('SELECT EXISTS (SELECT 1 FROM "user" WHERE is_superadmin)')
+                ).scalar()
+                if not has_admin:
+                    email = os.environ.get('SUPERADMIN_EMAIL', 'admin@company.com')
+                    username = os.environ.get('SUPERADMIN_USERNAME', 'admin')
+                    password = os.environ.get('SUPERADMIN_PASSWORD') or _gen_password()
+                    created_id = db.session.execute(text(
+                        """
+                        INSERT INTO "user" (username, email, password_hash, is_admin, is_superadmin, created_at)
+                        SELECT :username, :email, :password_hash, true, true, :created_at
+                        WHERE NOT EXISTS (SELECT 1 FROM "user" WHERE is_superadmin)
+                        ON CONFLICT DO NOTHING
+                        RETURNING id
+                        """
+                    ), {
+                        'username': username,
+                        'email': email,
+                        'password_hash': generate_password_hash(password),
+                        'created_at': datetime.utcnow(),
+                    }).scalar()
+                    db.session.commit()
+                if created_id is not None:
+                    print('[init] Superadmin created:')
+                    print(f'       username: {username}')
+                    print(f'       email   : {email}')
+                    print(f'       password: {password}')
+                    print('       IMPORTANT: Change this password immediately in user profile.')
+                elif has_admin:
+                    print('[init] Superadmin already exists — skipping creation')
+                else:
+                    print('[init] Superadmin not created: username or email already taken')
+            except Exception:
+                current_app.logger.exception('[init] Failed to create or verify superadmin user')
+
+        # In order, on this context's session: the column upgrade must land before a long hash is inserted
+        _ensure_generation_history()
+        _upgrade_password_hash_column()
+        _ensure_superadmin()
 
         # Seed global context prompts from JSON (idempotent)
         # Context prompts initialization removed (feature deleted)
@@ -1,21 +1,129 @@
+import os
+from functools import partial
+
 import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 from app import create_app, db
 from app.models.project import Project, ProjectUser
+from app.models import user as user_module
 from app.models.user import User
 
 
-@pytest.fixture
-def app():
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Report failures as they happen when pytest-instafail is available; kept out of
+    # pytest.ini addopts so environments without the plugin still run.
+    if hasattr(config.option, 'instafail'):
+        config.option.instafail = True
+
+
+def _enable_sqlite_savepoints(engine):
+    # pysqlite manages BEGIN itself and breaks SAVEPOINT; let SQLAlchemy drive it.
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _on_begin(conn):
+        conn.exec_driver_sql('BEGIN')
+
+
+def _isolate_worker_schema(engine, worker_id):
+    # Under pytest-xdist each worker gets its own schema on a shared server database;
+    # in-memory SQLite is already private to the worker process.
+    schema = f'test_{worker_id}'
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {schema}')
+        cursor.execute(f'SET search_path TO {schema}')
+        cursor.close()
+        dbapi_connection.commit()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _fast_password_hash():
+    # Single-iteration PBKDF2 keeps real hash strings (check_password still works)
+    # without paying for production-strength key stretching in tests.
+    patcher = pytest.MonkeyPatch()
+    patcher.setattr(user_module, 'generate_password_hash',
+                    partial(generate_password_hash, method='pbkdf2:sha256:1'))
+    yield
+    patcher.undo()
+
+
+@pytest.fixture(scope='session')
+def _app():
+    """Create the app and its schema once per test run."""
     app = create_app('config.TestingConfig')
     app.config.setdefault('TESTING', True)
     with app.app_context():
+        worker_id = os.environ.get('PYTEST_XDIST_WORKER')
+        if db.engine.dialect.name == 'sqlite':
+            _enable_sqlite_savepoints(db.engine)
+        elif worker_id:
+            _isolate_worker_schema(db.engine, worker_id)
         db.create_all()
         yield app
         db.session.remove()
         db.drop_all()
 
 
+@pytest.fixture(scope='session')
+def _seed(_app):
+    """Insert the shared admin user and project once per test run.
+
+    Per-test transactions are rolled back, so tests only ever see these rows
+    in their seeded state.
+    """
+    with _app.app_context():
+        user = User(username="admin", email="admin@example.com", is_admin=True)
+        user.set_password("password")
+        db.session.add(user)
+        db.session.commit()
+        project = Project(name="Test Project", created_by=user.id, response_style="standard")
+        db.session.add(project)
+        db.session.commit()
+        membership = ProjectUser(project_id=project.id, user_id=user.id, role='admin')
+        db.session.add(membership)
+        db.session.commit()
+        seed = {'admin_user_id': user.id, 'project_id': project.id}
+        db.session.remove()
+    return seed
+
+
+@pytest.fixture
+def app(_app, _seed):
+    """Run each test inside an outer transaction that is rolled back afterwards.
+
+    Commits made by the code under test only release savepoints, so no DDL or
+    cleanup is needed between tests.
+    """
+    config_snapshot = dict(_app.config)
+    with _app.app_context():
+        connection = db.engine.connect()
+        trans = connection.begin()
+        original_session = db.session
+        db.session = scoped_session(sessionmaker(
+            bind=connection,
+            query_cls=db.Query,
+            join_transaction_mode='create_savepoint',
+        ))
+        try:
+            yield _app
+        finally:
+            db.session.remove()
+            db.session = original_session
+            trans.rollback()
+            connection.close()
+            _app.config.clear()
+            _app.config.update(config_snapshot)
+
+
 @pytest.fixture
 def client(app):
     return app.test_client()
@@ -28,23 +136,13 @@ def app_ctx(app):
 
 
 @pytest.fixture
-def admin_user(app_ctx):
-    user = User(username="admin", email="admin@example.com", is_admin=True)
-    user.set_password("password")
-    db.session.add(user)
-    db.session.commit()
-    return user
+def admin_user(app_ctx, _seed):
+    return db.session.get(User, _seed['admin_user_id'])
 
 
 @pytest.fixture
-def project(app_ctx, admin_user):
-    project = Project(name="Test Project", created_by=admin_user.id, response_style="standard")
-    db.session.add(project)
-    db.session.commit()
-    membership = ProjectUser(project_id=project.id, user_id=admin_user.id, role='admin')
-    db.session.add(membership)
-    db.session.commit()
-    return project
+def project(app_ctx, _seed):
+    return db.session.get(Project, _seed['project_id'])
 
 
 @pytest.fixture
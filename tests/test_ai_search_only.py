@@ -1,9 +1,11 @@
 import json
 from datetime import datetime
+from types import SimpleNamespace
 
 import pytest
 
 from flask import current_app
+from sqlalchemy import insert, select
 
 from app import db
 from app.models.ai_usage_log import AIUsageLog
@@ -12,11 +14,17 @@ from app.services.ai_service import AIService
 from app.services.ai_providers.types import TokenUsage
 
 
+def _insert_knowledge_file(**values):
+    # Core INSERT: the tests only need the id, not a tracked ORM instance
+    result = db.session.execute(insert(KnowledgeFile).values(**values))
+    return result.inserted_primary_key[0]
+
+
 @pytest.mark.usefixtures('app_ctx')
 def test_ai_service_search_only_logs(project, admin_user):
     current_app.config['MULTI_QUERY_ENABLED'] = False
 
-    knowledge = KnowledgeFile(
+    knowledge_id = _insert_knowledge_file(
         project_id=project.id,
         filename='doc-1.txt',
         original_filename='Doc 1.txt',
@@ -29,7 +37,6 @@ def test_ai_service_search_only_logs(project, admin_user):
         uploaded_by=admin_user.id,
         chunks_count=1,
     )
-    db.session.add(knowledge)
     db.session.commit()
 
     service = AIService()
@@ -40,7 +47,7 @@ def test_ai_service_search_only_logs(project, admin_user):
                 'id': 'doc-1',
                 'content': 'Example fragment body',
                 'score': 0.87,
-                'metadata': {'title': 'Doc 1', 'file_id': knowledge.id}
+                'metadata': {'title': 'Doc 1', 'file_id': knowledge_id}
             }
         ]
 
@@ -66,21 +73,23 @@ def test_ai_service_search_only_logs(project, admin_user):
     assert bundle['context_file_names'] == ['Doc 1.txt']
     assert result['context_file_names'] == ['Doc 1.txt']
 
-    logs = AIUsageLog.query.filter_by(project_id=project.id).all()
-    assert len(logs) == 1
-    metadata = json.loads(logs[0].metadata_json)
+    metadata_rows = db.session.execute(
+        select(AIUsageLog.metadata_json).where(AIUsageLog.project_id == project.id)
+    ).scalars().all()
+    assert len(metadata_rows) == 1
+    metadata = json.loads(metadata_rows[0])
     assert metadata['mode'] == 'search_only'
     assert metadata['context_used'] == 1
     assert metadata['response_model'] == bundle.get('response_model')
     assert metadata['context_limit'] == bundle.get('context_limit')
-    assert metadata['context_file_ids'] == [knowledge.id]
+    assert metadata['context_file_ids'] == [knowledge_id]
 
 
 @pytest.mark.usefixtures('app_ctx')
 def test_build_email_prompt_multi_query_flow(project, admin_user):
     current_app.config['MULTI_QUERY_ENABLED'] = True
 
-    knowledge = KnowledgeFile(
+    knowledge_id = _insert_knowledge_file(
         project_id=project.id,
         filename='doc-2.txt',
         original_filename='Doc 2.txt',
@@ -93,7 +102,6 @@ def test_build_email_prompt_multi_query_flow(project, admin_user):
         uploaded_by=admin_user.id,
         chunks_count=1,
     )
-    db.session.add(knowledge)
     db.session.commit()
 
     service = AIService()
@@ -115,7 +123,7 @@ def test_build_email_prompt_multi_query_flow(project, admin_user):
                 'id': f"{query_text}-doc",
                 'content': f"Excerpt for {query_text}",
                 'score': 0.9 if 'lease' in query_text else 0.86,
-                'metadata': {'title': 'Doc 2', 'file_id': knowledge.id},
+                'metadata': {'title': 'Doc 2', 'file_id': knowledge_id},
             }
         ]
 
@@ -154,7 +162,7 @@ def test_build_email_prompt_multi_query_flow(project, admin_user):
 def test_build_email_prompt_rerank_fallback(project, admin_user):
     current_app.config['MULTI_QUERY_ENABLED'] = False
 
-    knowledge = KnowledgeFile(
+    knowledge_id = _insert_knowledge_file(
         project_id=project.id,
         filename='doc-3.txt',
         original_filename='Doc 3.txt',
@@ -167,7 +175,6 @@ def test_build_email_prompt_rerank_fallback(project, admin_user):
         uploaded_by=admin_user.id,
         chunks_count=1,
     )
-    db.session.add(knowledge)
     db.session.commit()
 
     service = AIService()
@@ -178,13 +185,13 @@ def test_build_email_prompt_rerank_fallback(project, admin_user):
                 'id': 'doc-high',
                 'content': 'High score excerpt',
                 'score': 0.92,
-                'metadata': {'title': 'Doc High', 'file_id': knowledge.id},
+                'metadata': {'title': 'Doc High', 'file_id': knowledge_id},
             },
             {
                 'id': 'doc-low',
                 'content': 'Low score excerpt',
                 'score': 0.41,
-                'metadata': {'title': 'Doc Low', 'file_id': knowledge.id},
+                'metadata': {'title': 'Doc Low', 'file_id': knowledge_id},
             },
         ]
 
@@ -216,9 +223,96 @@ def test_build_email_prompt_rerank_fallback(project, admin_user):
     assert bundle['retrieval_top_k'] >= 2
 
 
+def _make_stub_ai_service(knowledge_id):
+    """Return an AIService stand-in factory and the dict recording what it was called with."""
+    state = {}
+
+    def build_email_prompt(project_id, email_content, style_hint, **kwargs):
+        state['build'] = {
+            'project_id': project_id,
+            'email_content': email_content,
+            'style_hint': style_hint,
+            'kwargs': kwargs,
+        }
+        return {
+            'system_prompt': 'sys',
+            'user_prompt': 'user',
+            'context_docs': [
+                {
+                    'id': 'doc',
+                    'content': 'Example',
+                    'score': 0.9,
+                    'metadata': {'title': 'doc.txt', 'file_id': knowledge_id}
+                }
+            ],
+            'context_file_ids': [knowledge_id],
+            'multi_query_used': False,
+            'multi_query_variants': [],
+            'multi_query_variant_count': 0,
+            'multi_query_mode': 'org_off',
+            'multi_query_model': None,
+            'multi_query_usage': {'prompt_tokens': 1, 'completion_tokens': 0, 'total_tokens': 1},
+            'rerank_usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            'token_usage_breakdown': {
+                'multi_query': {'prompt_tokens': 1, 'completion_tokens': 0, 'total_tokens': 1},
+                'rerank': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            },
+            'retrieval_top_k': 1,
+            'retrieval_threshold': None,
+            'context_limit': 1,
+            'rerank_provider': None,
+            'rerank_model': None,
+            'rerank_top_k': None,
+            'rerank_threshold': None,
+            'rerank_settings': {},
+            'response_model': 'gpt-5-mini',
+            'prefetch_limit': kwargs.get('prefetch_limit'),
+            'colbert_candidates': kwargs.get('colbert_candidates'),
+            'rrf_k': kwargs.get('rrf_k'),
+            'rrf_weights': kwargs.get('rrf_weights'),
+            'hybrid_per_vector_limit': kwargs.get('hybrid_per_vector_limit'),
+            'hybrid_rrf_k': kwargs.get('hybrid_rrf_k'),
+        }
+
+    def run_search_only(project_id, prompt_bundle):
+        return {
+            'success': True,
+            'mode': 'search_only',
+            'context_used': len(prompt_bundle['context_docs']),
+            'context_docs': prompt_bundle['context_docs'],
+            'context_file_ids': prompt_bundle['context_file_ids'],
+            'token_usage_breakdown': prompt_bundle['token_usage_breakdown'],
+            'multi_query_used': prompt_bundle['multi_query_used'],
+            'multi_query_variants': prompt_bundle['multi_query_variants'],
+            'multi_query_usage': prompt_bundle['multi_query_usage'],
+            'rerank_usage': prompt_bundle['rerank_usage'],
+            'tokens_input': 0,
+            'tokens_output': 0,
+            'tokens_total': 0,
+            'retrieval_top_k': prompt_bundle['retrieval_top_k'],
+            'retrieval_threshold': prompt_bundle['retrieval_threshold'],
+            'context_limit': prompt_bundle['context_limit'],
+            'response_model': prompt_bundle['response_model'],
+            'prefetch_limit': prompt_bundle.get('prefetch_limit'),
+            'colbert_candidates': prompt_bundle.get('colbert_candidates'),
+            'rrf_k': prompt_bundle.get('rrf_k'),
+            'rrf_weights': prompt_bundle.get('rrf_weights'),
+        }
+
+    def factory():
+        return SimpleNamespace(
+            build_email_prompt=build_email_prompt,
+            run_search_only=run_search_only,
+            count_tokens=lambda text: 0,
+            generate_response=lambda *args, **kwargs: {},
+        )
+
+    return factory, state
+
+
 @pytest.mark.usefixtures('app_ctx')
 def test_generate_response_search_only_mode(login_client, project, admin_user, monkeypatch):
-    knowledge = KnowledgeFile(
+    knowledge_id = _insert_knowledge_file(
         project_id=project.id,
         filename='doc.txt',
         original_filename='doc.txt',
@@ -231,95 +325,10 @@ def test_generate_response_search_only_mode(login_client, project, admin_user, m
         uploaded_by=admin_user.id,
         chunks_count=1
     )
-    db.session.add(knowledge)
     db.session.commit()
 
-    class StubAIService:
-        last_instance = None
-
-        def __init__(self):
-            self.last_build_kwargs = None
-            StubAIService.last_instance = self
-
-        def build_email_prompt(self, project_id, email_content, style_hint, **kwargs):
-            self.last_build_kwargs = {
-                'project_id': project_id,
-                'email_content': email_content,
-                'style_hint': style_hint,
-                'kwargs': kwargs,
-            }
-            return {
-                'system_prompt': 'sys',
-                'user_prompt': 'user',
-                'context_docs': [
-                    {
-                        'id': 'doc',
-                        'content': 'Example',
-                        'score': 0.9,
-                        'metadata': {'title': 'doc.txt', 'file_id': knowledge.id}
-                    }
-                ],
-                'context_file_ids': [knowledge.id],
-                'multi_query_used': False,
-                'multi_query_variants': [],
-                'multi_query_variant_count': 0,
-                'multi_query_mode': 'org_off',
-                'multi_query_model': None,
-                'multi_query_usage': {'prompt_tokens': 1, 'completion_tokens': 0, 'total_tokens': 1},
-                'rerank_usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
-                'token_usage_breakdown': {
-                    'multi_query': {'prompt_tokens': 1, 'completion_tokens': 0, 'total_tokens': 1},
-                    'rerank': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
-                },
-                'retrieval_top_k': 1,
-                'retrieval_threshold': None,
-                'context_limit': 1,
-                'rerank_provider': None,
-                'rerank_model': None,
-                'rerank_top_k': None,
-                'rerank_threshold': None,
-                'rerank_settings': {},
-                'response_model': 'gpt-5-mini',
-                'prefetch_limit': kwargs.get('prefetch_limit'),
-                'colbert_candidates': kwargs.get('colbert_candidates'),
-                'rrf_k': kwargs.get('rrf_k'),
-                'rrf_weights': kwargs.get('rrf_weights'),
-                'hybrid_per_vector_limit': kwargs.get('hybrid_per_vector_limit'),
-                'hybrid_rrf_k': kwargs.get('hybrid_rrf_k'),
-            }
-
-        def run_search_only(self, project_id, prompt_bundle):
-            return {
-                'success': True,
-                'mode': 'search_only',
-                'context_used': len(prompt_bundle['context_docs']),
-                'context_docs': prompt_bundle['context_docs'],
-                'context_file_ids': prompt_bundle['context_file_ids'],
-                'token_usage_breakdown': prompt_bundle['token_usage_breakdown'],
-                'multi_query_used': prompt_bundle['multi_query_used'],
-                'multi_query_variants': prompt_bundle['multi_query_variants'],
-                'multi_query_usage': prompt_bundle['multi_query_usage'],
-                'rerank_usage': prompt_bundle['rerank_usage'],
-                'tokens_input': 0,
-                'tokens_output': 0,
-                'tokens_total': 0,
-                'retrieval_top_k': prompt_bundle['retrieval_top_k'],
-                'retrieval_threshold': prompt_bundle['retrieval_threshold'],
-                'context_limit': prompt_bundle['context_limit'],
-                'response_model': prompt_bundle['response_model'],
-                'prefetch_limit': prompt_bundle.get('prefetch_limit'),
-                'colbert_candidates': prompt_bundle.get('colbert_candidates'),
-                'rrf_k': prompt_bundle.get('rrf_k'),
-                'rrf_weights': prompt_bundle.get('rrf_weights'),
-            }
-
-        def count_tokens(self, text):
-            return 0
-
-        def generate_response(self, *args, **kwargs):
-            return {}
-
-    monkeypatch.setattr('app.routes.api.AIService', StubAIService)
+    stub_factory, stub_state = _make_stub_ai_service(knowledge_id)
+    monkeypatch.setattr('app.routes.api.AIService', stub_factory)
 
     resp = login_client.post(
         f'/api/projects/{project.public_id}/generate-response',
@@ -351,10 +360,8 @@ def test_generate_response_search_only_mode(login_client, project, admin_user, m
     assert data['mode'] == 'search_only'
     assert data['tokens_used'] == 1
     assert data['context_filenames'] == ['doc.txt']
-    assert data['context_docs'][0]['metadata']['file_id'] == knowledge.id
-    stub_instance = StubAIService.last_instance
-    assert stub_instance is not None
-    forwarded = stub_instance.last_build_kwargs
+    assert data['context_docs'][0]['metadata']['file_id'] == knowledge_id
+    forwarded = stub_state.get('build')
     assert forwarded is not None
     overrides = forwarded['kwargs']
     assert overrides['max_context_docs'] == 5
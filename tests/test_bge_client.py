@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import base64
 from typing import List
 
+import numpy as np
 import pytest
+import requests
+from unittest import mock
 from unittest.mock import Mock
 
 from app.services.bge_client import (
@@ -10,18 +14,30 @@ from app.services.bge_client import (
     BGEClientError,
     BGEResult,
     BGESparseVector,
-    _RetryableBGEError,
+    decode_dense,
 )
 
 
-def _make_result() -> BGEResult:
-    sparse = BGESparseVector(indices=[1, 3], values=[0.5, 0.7])
-    return BGEResult(
-        lexical=[sparse],
-        colbert_tokens=[[[0.1, 0.2], [0.3, 0.4]]],
-        colbert_agg=[[0.9, 0.8]],
-        meta={"model": "bge-m3"},
-    )
+class FlakySession:
+    """requests.Session stand-in that fails ``n_fail`` times before answering."""
+
+    def __init__(self, n_fail: int) -> None:
+        self.n_fail = n_fail
+        self.calls = 0
+
+    def post(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls <= self.n_fail:
+            raise requests.ConnectionError("busy")
+        response = Mock()
+        response.status_code = 200
+        response.json.return_value = {
+            "lexical_sparse": [{"indices": [1, 3], "values": [0.5, 0.7]}],
+            "colbert": [[[0.1, 0.2], [0.3, 0.4]]],
+            "colbert_agg": [[0.9, 0.8]],
+            "meta": {"model": "bge-m3"},
+        }
+        return response
 
 
 def test_encode_success_parses_response(monkeypatch):
@@ -47,54 +63,49 @@ def test_encode_success_parses_response(monkeypatch):
     assert result.meta["model"] == "bge-m3"
 
 
-def test_encode_retries_then_succeeds(monkeypatch):
-    client = BGEClient(base_url="http://bge")
+def _patch_retry(attempts: int, backoff: float):
+    """Patch the retry knobs on BGEClient in one go."""
+    return mock.patch.multiple(
+        BGEClient,
+        _retry_attempts=lambda self: attempts,
+        _retry_backoff=lambda self: backoff,
+        _retry_jitter=lambda self: 0.0,
+    )
 
-    attempt_log: List[int] = []
 
-    def fake_request(self, payload):
-        attempt_log.append(1)
-        if len(attempt_log) == 1:
-            raise _RetryableBGEError("temporary")
-        return _make_result()
+def test_encode_retries_then_succeeds():
+    session = FlakySession(1)
+    client = BGEClient(base_url="http://bge", session=session)
 
     mock_logger = Mock()
     sleep_calls: List[float] = []
 
-    monkeypatch.setattr(BGEClient, "_perform_encode_request", fake_request, raising=False)
-    monkeypatch.setattr(BGEClient, "_retry_attempts", lambda self: 3, raising=False)
-    monkeypatch.setattr(BGEClient, "_retry_backoff", lambda self: 0.2, raising=False)
-    monkeypatch.setattr(BGEClient, "_retry_jitter", lambda self: 0.0, raising=False)
-    monkeypatch.setattr("app.services.bge_client.random.uniform", lambda a, b: 0.0)
-    monkeypatch.setattr("app.services.bge_client.time.sleep", lambda value: sleep_calls.append(value))
-    monkeypatch.setattr("app.services.bge_client._logger", lambda: mock_logger)
-
-    result = client.encode(["query"])
+    with _patch_retry(3, 0.2), \
+            mock.patch("app.services.bge_client.random.uniform", return_value=0.0), \
+            mock.patch("app.services.bge_client.time.sleep", side_effect=sleep_calls.append), \
+            mock.patch("app.services.bge_client._logger", return_value=mock_logger):
+        result = client.encode(["query"])
 
     assert isinstance(result, BGEResult)
-    assert len(attempt_log) == 2
+    assert result.first_sparse() == BGESparseVector(indices=[1, 3], values=[0.5, 0.7])
+    assert session.calls == 2
     assert sleep_calls == [0.2]
     mock_logger.warning.assert_called_once()
 
 
-def test_encode_retries_exhausted(monkeypatch):
-    client = BGEClient(base_url="http://bge")
-
-    def always_fail(self, payload):  # pragma: no cover - patched behaviour
-        raise _RetryableBGEError("busy")
+def test_encode_retries_exhausted():
+    session = FlakySession(2)
+    client = BGEClient(base_url="http://bge", session=session)
 
     sleep_calls: List[float] = []
 
-    monkeypatch.setattr(BGEClient, "_perform_encode_request", always_fail, raising=False)
-    monkeypatch.setattr(BGEClient, "_retry_attempts", lambda self: 2, raising=False)
-    monkeypatch.setattr(BGEClient, "_retry_backoff", lambda self: 0.1, raising=False)
-    monkeypatch.setattr(BGEClient, "_retry_jitter", lambda self: 0.0, raising=False)
-    monkeypatch.setattr("app.services.bge_client.time.sleep", lambda value: sleep_calls.append(value))
-
-    with pytest.raises(BGEClientError) as excinfo:
-        client.encode(["query"])
+    with _patch_retry(2, 0.1), \
+            mock.patch("app.services.bge_client.time.sleep", side_effect=sleep_calls.append):
+        with pytest.raises(BGEClientError) as excinfo:
+            client.encode(["query"])
 
     assert "busy" in str(excinfo.value)
+    assert session.calls == 2
     assert sleep_calls == [0.1]
 
 
@@ -102,4 +113,53 @@ def test_encode_rejects_empty_sentences():
     client = BGEClient(base_url="http://bge")
 
     with pytest.raises(ValueError):
-        client.encode([" ", ""])
\ No newline at end of file
+        client.encode([" ", ""])
+
+def test_max_encode_secs_covers_every_attempt_and_backoff():
+    client = BGEClient(base_url="http://bge", timeout=2.0)
+
+    with mock.patch.multiple(
+        BGEClient,
+        _retry_attempts=lambda self: 3,
+        _retry_backoff=lambda self: 0.5,
+        _retry_jitter=lambda self: 0.25,
+    ):
+        # 3 timeouts + sleeps after attempts 1 and 2 (0.5 + 0.25, 1.0 + 0.25)
+        assert client.max_encode_secs() == pytest.approx(3 * 2.0 + 0.75 + 1.25)
+
+
+def _wire_dense(mat: np.ndarray, precision: str) -> dict:
+    """Build a ``dense_encoded`` payload the way docker/bge_m3 ``_quantize_dense`` does."""
+    encoded = {"dtype": precision, "shape": list(mat.shape)}
+    if precision == "int8":
+        scales = np.abs(mat).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.round(mat / scales[:, None]).astype("<i1")
+        encoded["scales"] = scales.astype(float).tolist()
+    else:
+        data = mat.astype("<f2")
+    encoded["data"] = base64.b64encode(data.tobytes()).decode("ascii")
+    return encoded
+
+
+@pytest.mark.parametrize("precision, tolerance", [("fp16", 1e-3), ("int8", 1e-2)])
+def test_encode_decodes_quantized_dense(precision, tolerance):
+    dense = np.random.default_rng(0).uniform(-1, 1, size=(2, 16)).astype(np.float32)
+    dense[1] = 0.0  # all-zero row keeps its unit scale
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = {"dense": None, "dense_encoded": _wire_dense(dense, precision)}
+    session = Mock()
+    session.post.return_value = response
+
+    client = BGEClient(base_url="http://bge", session=session)
+    result = client.encode(["query"], return_dense=True, dense_precision=precision)
+
+    assert session.post.call_args.kwargs["json"]["dense_precision"] == precision
+    assert np.allclose(result.dense, dense, atol=tolerance)
+    assert result.first_dense() == result.dense[0]
+
+
+def test_decode_dense_rejects_malformed_payload():
+    with pytest.raises(BGEClientError):
+        decode_dense({"dtype": "int4", "shape": [1, 2], "data": ""})
@@ -1,6 +1,7 @@
 import io
 import struct
 import socket
+from collections import deque
 
 import pytest
 
@@ -9,25 +10,36 @@ from app.utils.clamav_client import (
     ClamAVConnectionError,
 )
 
+# Any real socket use (e.g. a refactor bypassing create_connection) fails fast
+# instead of stalling on the network.
+pytestmark = pytest.mark.disable_socket
+
 
 class FakeSocket:
     """Minimal socket stub capturing writes and returning queued responses."""
 
-    def __init__(self, responses):
-        self._responses = list(responses)
+    def __init__(self, responses=()):
+        self._responses = deque(responses)
         self._writes = []
+        self._buf = bytearray()
 
     @property
     def writes(self):
         return self._writes
 
+    @property
+    def sent(self):
+        """Everything written so far, as one contiguous buffer."""
+        return self._buf
+
     def sendall(self, data):
         self._writes.append(data)
+        self._buf += data
 
     def recv(self, bufsize):  # pragma: no cover - behaviour dictated by queued responses
         if not self._responses:
             return b""
-        return self._responses.pop(0)
+        return self._responses.popleft()
 
     # Context manager API used by ClamAVClient
     def __enter__(self):
@@ -37,45 +49,65 @@ class FakeSocket:
         return False
 
 
-def test_ping_success(monkeypatch):
-    fake_sock = FakeSocket([b"PONG\n"])
+class FakeConnector:
+    """Stand-in for socket.create_connection handing out one scripted FakeSocket.
+
+    Calling it with responses arms the socket; until then every connection
+    attempt fails with OSError. Attempted addresses are recorded in ``attempts``.
+    """
+
+    def __init__(self):
+        self.sock = None
+        self.attempts = []
+
+    def __call__(self, responses=()):
+        self.sock = FakeSocket(responses)
+        return self.sock
+
+    def create_connection(self, addr, timeout=None):
+        self.attempts.append(addr)
+        if self.sock is None:
+            raise OSError("boom")
+        return self.sock
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    # Retry backoff must never cost wall-clock time, whatever delay the client uses
+    monkeypatch.setattr("app.utils.clamav_client.time.sleep", lambda *_: None)
 
-    def fake_create_conn(addr, timeout=None):
-        return fake_sock
 
-    monkeypatch.setattr(socket, "create_connection", fake_create_conn)
+@pytest.fixture
+def fake_conn(monkeypatch):
+    connector = FakeConnector()
+    monkeypatch.setattr(socket, "create_connection", connector.create_connection)
+    return connector
+
+
+def test_ping_success(fake_conn):
+    fake_sock = fake_conn([b"PONG\n"])
 
     client = ClamAVClient()
     assert client.ping() is True
     assert fake_sock.writes == [b"nPING\n"]
 
 
-def test_instream_ok(monkeypatch):
-    fake_sock = FakeSocket([b"stream: OK\x00\n"])
-
-    def fake_create_conn(addr, timeout=None):
-        return fake_sock
-
-    monkeypatch.setattr(socket, "create_connection", fake_create_conn)
+def test_instream_ok(fake_conn):
+    fake_sock = fake_conn([b"stream: OK\x00\n"])
 
     payload = io.BytesIO(b"hello world")
     client = ClamAVClient()
     result = client.instream(payload, chunk_size=4)
 
     assert result == {"stream": ("OK", None)}
-    # First write switches to INSTREAM mode
-    assert fake_sock.writes[0] == b"zINSTREAM\0"
-    # Last write terminates the stream (zero-length chunk)
-    assert fake_sock.writes[-1] == struct.pack("!I", 0)
-
+    # Stream opens with the INSTREAM command
+    assert fake_sock.sent.startswith(b"zINSTREAM\0")
+    # ...and is terminated by a zero-length chunk
+    assert fake_sock.sent.endswith(struct.pack("!I", 0))
 
-def test_instream_detects_malware(monkeypatch):
-    fake_sock = FakeSocket([b"stream: Eicar-Test-Signature FOUND\n"])
 
-    def fake_create_conn(addr, timeout=None):
-        return fake_sock
-
-    monkeypatch.setattr(socket, "create_connection", fake_create_conn)
+def test_instream_detects_malware(fake_conn):
+    fake_conn([b"stream: Eicar-Test-Signature FOUND\n"])
 
     payload = io.BytesIO(b"dummy")
     client = ClamAVClient()
@@ -84,17 +116,9 @@ def test_instream_detects_malware(monkeypatch):
     assert result == {"stream": ("FOUND", "Eicar-Test-Signature")}
 
 
-def test_connect_retries_and_raises(monkeypatch):
-    attempts = []
-
-    def fake_create_conn(addr, timeout=None):
-        attempts.append(addr)
-        raise OSError("boom")
-
-    monkeypatch.setattr(socket, "create_connection", fake_create_conn)
-
-    client = ClamAVClient(retries=3, retry_delay=0)
+def test_connect_retries_and_raises(fake_conn):
+    client = ClamAVClient(retries=3)
     with pytest.raises(ClamAVConnectionError):
         client.ping()
 
-    assert len(attempts) == 3
+    assert len(fake_conn.attempts) == 3
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import pytest
+
+from app import db
+from app.models.ai_usage_log import AIUsageLog
+from app.models.knowledge_file import KnowledgeFile
+from app.services.ai_providers.types import TokenUsage
+from app.services.file_processor import UPSERT_BATCH_SIZE, FileProcessor
+
+
+class _StubAIService:
+    def __init__(self, n_chunks: int) -> None:
+        self.n_chunks = n_chunks
+
+    def chunk_text(self, text):
+        return [f"chunk {i}" for i in range(self.n_chunks)]
+
+    def count_tokens(self, text):
+        return 1
+
+    def generate_embeddings(self, text):
+        return [0.1, 0.2, 0.3], TokenUsage(prompt_tokens=1)
+
+
+class _RecordingVectorService:
+    """Records (batch size, wait, usage rows already logged) for every add_documents call."""
+
+    def __init__(self, project_id: int) -> None:
+        self.project_id = project_id
+        self.calls = []
+
+    def check_connectivity(self):
+        return True, None
+
+    def create_collection(self, project_id):
+        pass
+
+    def _collection_name(self, project_id):
+        return f"project_{project_id}"
+
+    def add_documents(self, project_id, documents, wait=True):
+        logged = AIUsageLog.query.filter_by(project_id=self.project_id).count()
+        self.calls.append((len(documents), wait, logged))
+        return True
+
+
+def _ingest(app, project, admin_user, tmp_path, monkeypatch, n_chunks):
+    knowledge_file = KnowledgeFile(
+        project_id=project.id,
+        filename="doc.txt",
+        original_filename="doc.txt",
+        file_size=1,
+        file_type="txt",
+        file_path=str(tmp_path / "doc.txt"),
+        uploaded_by=admin_user.id,
+    )
+    db.session.add(knowledge_file)
+    db.session.commit()
+
+    processor = FileProcessor(app)
+    processor._ai_service = _StubAIService(n_chunks)
+    processor._vector_service = _RecordingVectorService(project.id)
+    monkeypatch.setattr(processor, "_convert_file_to_markdown", lambda kf, force_full_ocr=False: "text")
+    monkeypatch.setattr(processor, "encode_bge", lambda text: (None, None))
+
+    processor._process_file(knowledge_file.id)
+    return knowledge_file, processor._vector_service.calls
+
+
+@pytest.mark.parametrize(
+    "n_chunks, tokens_limit, expected",
+    [
+        pytest.param(UPSERT_BATCH_SIZE, None, [(UPSERT_BATCH_SIZE, True)], id="one-full-batch"),
+        pytest.param(
+            2 * UPSERT_BATCH_SIZE, None,
+            [(UPSERT_BATCH_SIZE, False), (UPSERT_BATCH_SIZE, True)],
+            id="exact-multiple",
+        ),
+        pytest.param(
+            # One token per chunk: the monthly limit breaks the loop on the chunk right
+            # after the first async flush, leaving a single queued chunk.
+            2 * UPSERT_BATCH_SIZE, UPSERT_BATCH_SIZE + 1,
+            [(UPSERT_BATCH_SIZE, False), (1, True)],
+            id="break-after-async-flush",
+        ),
+    ],
+)
+def test_process_file_ends_with_waited_upsert(
+    app, project, admin_user, tmp_path, monkeypatch, n_chunks, tokens_limit, expected
+):
+    # Project carries no token limit column; _process_file reads the attribute directly.
+    project.tokens_limit = tokens_limit
+
+    knowledge_file, calls = _ingest(app, project, admin_user, tmp_path, monkeypatch, n_chunks)
+
+    assert [(size, wait) for size, wait, _ in calls] == expected
+    # Usage rows for a batch are only logged once its upsert succeeded.
+    flushed = 0
+    for size, _, logged in calls:
+        assert logged == flushed
+        flushed += size
+    assert AIUsageLog.query.filter_by(project_id=project.id).count() == flushed
+    assert knowledge_file.status == "processed"
+    assert knowledge_file.chunks_count == flushed
@@ -1,55 +1,176 @@
+import functools
+import hashlib
+import json
+import shutil
+import subprocess
 from pathlib import Path
 
 import js2py
 import pytest
 
 
-_SANITIZER_JS = Path("app/static/js/lib/sanitize.js").read_text(encoding="utf-8")
+# Keep every case on one xdist worker (``pytest -n auto --dist=loadgroup``) so the
+# session-scoped sanitizer context is built once rather than once per worker.
+pytestmark = pytest.mark.xdist_group("sanitizer")
 
+_SANITIZER_PATH = Path(__file__).resolve().parents[1] / "app" / "static" / "js" / "lib" / "sanitize.js"
 
-def _build_ctx():
-    ctx = js2py.EvalJs({})
-    ctx.execute("var window = this; var globalThis = this;")
-    ctx.execute(_SANITIZER_JS)
-    return ctx
 
+@functools.cache
+def _sanitizer_source():
+    """sanitize.js contents, read on first use (the Node backend loads the file itself)."""
+    return _SANITIZER_PATH.read_text(encoding="utf-8")
 
-def test_sanitize_removes_script_blocks():
-    ctx = _build_ctx()
-    result = ctx.sanitizeHtmlFragment('<div><script>alert(1)</script><span>ok</span></div>')
-    assert "<script" not in result.lower()
-    assert '<span>ok</span>' in result
 
+def _translated_sanitizer(cache):
+    """Return sanitize.js translated to Python, reusing the copy in pytest's cache dir.
 
-def test_sanitize_removes_event_handlers():
-    ctx = _build_ctx()
-    dirty = '<button onclick="alert(1)" onerror="foo">Run</button>'
-    result = ctx.sanitizeHtmlFragment(dirty)
-    assert 'onclick' not in result.lower()
-    assert 'onerror' not in result.lower()
-    assert '<button' in result
+    The key covers the script and the js2py version, so either changing
+    invalidates the entry.
+    """
+    key = hashlib.sha1(f"{getattr(js2py, '__version__', '')}\0{_sanitizer_source()}".encode("utf-8")).hexdigest()
+    cache_path = cache.mkdir("js2py") / f"sanitize_{key}.py" if cache is not None else None
+    if cache_path is not None and cache_path.exists():
+        return cache_path.read_text(encoding="utf-8"), str(cache_path)
+    # No header: the code runs inside an existing EvalJs scope
+    py_src = js2py.translate_js(_sanitizer_source(), "")
+    if cache_path is None:
+        return py_src, "<sanitize.js>"
+    cache_path.write_text(py_src, encoding="utf-8")
+    return py_src, str(cache_path)
 
 
-def test_sanitize_neutralises_javascript_urls():
-    ctx = _build_ctx()
-    dirty = '<a href="javascript:alert(1)">Click</a><img src="data:text/html;base64,aaaa">'
-    result = ctx.sanitizeHtmlFragment(dirty)
-    assert 'javascript:' not in result.lower()
-    assert 'data:text/html' not in result.lower()
-    assert 'href="#"' in result.lower()
-    assert 'src="#"' in result.lower()
+# Line-oriented driver: each stdin line is a JSON [mode, payload] pair ('replace' takes
+# one html string, 'many' a list of fragments), each stdout line the JSON result.
+_NODE_DRIVER = r"""
+globalThis.window = globalThis;
+(0, eval)(require('fs').readFileSync(process.argv[1], 'utf8'));
+require('readline').createInterface({ input: process.stdin }).on('line', (line) => {
+  const [mode, payload] = JSON.parse(line);
+  let out;
+  if (mode === 'replace') {
+    const stub = { innerHTML: '' };
+    safeReplaceHtml(stub, payload);
+    out = stub.innerHTML;
+  } else {
+    out = payload.map((item) => sanitizeHtmlFragment(item));
+  }
+  process.stdout.write(JSON.stringify(out) + '\n');
+});
+"""
 
 
-def test_safe_replace_sets_clean_html():
-    ctx = _build_ctx()
-    ctx.execute('var stub = { innerHTML: "" };')
-    ctx.safeReplaceHtml(ctx.stub, '<div><script>boom</script><p>ok</p></div>')
-    assert '<script' not in ctx.stub.innerHTML.lower()
-    assert '<p>ok</p>' in ctx.stub.innerHTML
+class _NodeSanitizer:
+    """Runs sanitize.js in a long-lived Node process (a real engine, no translation)."""
 
+    def __init__(self, node):
+        self._proc = subprocess.Popen(
+            [node, "-e", _NODE_DRIVER, str(_SANITIZER_PATH)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+        )
 
-def test_sanitize_handles_empty_values():
-    ctx = _build_ctx()
-    assert ctx.sanitizeHtmlFragment(None) == ""
-    assert ctx.sanitizeHtmlFragment("") == ""
-    assert ctx.sanitizeHtmlFragment("Plain text") == "Plain text"
+    def _call(self, mode, html):
+        self._proc.stdin.write(json.dumps([mode, html]) + "\n")
+        self._proc.stdin.flush()
+        return json.loads(self._proc.stdout.readline())
+
+    def sanitize_many(self, fragments):
+        return self._call("many", list(fragments))
+
+    def safe_replace(self, html):
+        return self._call("replace", html)
+
+    def close(self):
+        self._proc.stdin.close()
+        self._proc.wait(timeout=5)
+
+
+class _Js2PySanitizer:
+    """Fallback for machines without Node: the same calls through a js2py context."""
+
+    def __init__(self, ctx):
+        self._ctx = ctx
+        ctx.execute("function sanitizeAll(a){ return a.map(function(x){ return sanitizeHtmlFragment(x); }); }")
+
+    def sanitize_many(self, fragments):
+        # One Python->JS crossing for the whole batch
+        return self._ctx.sanitizeAll(list(fragments)).to_list()
+
+    def safe_replace(self, html):
+        # Fresh stub per call so the shared context carries no state between tests
+        self._ctx.execute('var stub = { innerHTML: "" };')
+        self._ctx.safeReplaceHtml(self._ctx.stub, html)
+        return self._ctx.stub.innerHTML
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(scope="session")
+def sanitizer_ctx(request):
+    node = shutil.which("node")
+    if node:
+        sanitizer = _NodeSanitizer(node)
+    else:
+        # Translating sanitize.js is the expensive part; the functions are pure, so one
+        # context can serve every test, and the translation itself is cached across runs.
+        ctx = js2py.EvalJs({})
+        ctx.execute("var window = this; var globalThis = this;")
+        py_src, filename = _translated_sanitizer(getattr(request.config, "cache", None))
+        exec(compile(py_src, filename, "exec"), ctx._context)
+        sanitizer = _Js2PySanitizer(ctx)
+    yield sanitizer
+    sanitizer.close()
+
+
+# (mode, input, expectations); "absent" needles are matched case-insensitively.
+_CASES = [
+    pytest.param(
+        "fragment", '<div><script>alert(1)</script><span>ok</span></div>',
+        [("absent", "<script"), ("present", "<span>ok</span>")],
+        id="removes-script-blocks",
+    ),
+    pytest.param(
+        "fragment", '<button onclick="alert(1)" onerror="foo">Run</button>',
+        [("absent", "onclick"), ("absent", "onerror"), ("present", "<button")],
+        id="removes-event-handlers",
+    ),
+    pytest.param(
+        "fragment", '<a href="javascript:alert(1)">Click</a><img src="data:text/html;base64,aaaa">',
+        [("absent", "javascript:"), ("absent", "data:text/html"), ("present", 'href="#"'), ("present", 'src="#"')],
+        id="neutralises-javascript-urls",
+    ),
+    pytest.param(
+        "replace", '<div><script>boom</script><p>ok</p></div>',
+        [("absent", "<script"), ("present", "<p>ok</p>")],
+        id="safe-replace-sets-clean-html",
+    ),
+    pytest.param("fragment", None, [("equals", "")], id="none"),
+    pytest.param("fragment", "", [("equals", "")], id="empty"),
+    pytest.param("fragment", "Plain text", [("equals", "Plain text")], id="plain-text"),
+]
+
+
+@pytest.fixture(scope="module")
+def fragment_results(sanitizer_ctx):
+    """Sanitize every fragment case in a single engine call, keyed by input."""
+    inputs = [param.values[1] for param in _CASES if param.values[0] == "fragment"]
+    return dict(zip(inputs, sanitizer_ctx.sanitize_many(inputs)))
+
+
+@pytest.mark.parametrize("mode, dirty, expectations", _CASES)
+def test_sanitize(sanitizer_ctx, fragment_results, mode, dirty, expectations):
+    if mode == "replace":
+        result = sanitizer_ctx.safe_replace(dirty)
+    else:
+        result = fragment_results[dirty]
+    for kind, needle in expectations:
+        if kind == "absent":
+            assert needle not in result.lower(), result
+        elif kind == "present":
+            assert needle in result, result
+        else:
+            assert result == needle
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+from app.services.vector_service import VectorService
+
+
+def test_bge_wait_bound_uses_configured_timeout(app_ctx, app):
+    app.config.update(
+        BGE_M3_TIMEOUT=4.0,
+        BGE_RETRY_ATTEMPTS=2,
+        BGE_RETRY_BACKOFF_SECS=0.5,
+        BGE_RETRY_JITTER_SECS=0.0,
+    )
+    service = VectorService()
+
+    assert service._bge()._timeout() == 4.0
+    assert service._bge().max_encode_secs() == pytest.approx(2 * 4.0 + 0.5)
+
+
+class _CountingProvider:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def generate_embeddings(self, text):
+        self.calls += 1
+        return [0.1, 0.2, 0.3]
+
+
+class _OtherProvider(_CountingProvider):
+    pass
+
+
+def test_query_embedding_cache_is_per_provider(app_ctx, monkeypatch):
+    service = VectorService()
+    monkeypatch.setattr(service, '_ensure_collection', lambda project_id: None)
+    monkeypatch.setattr(service, '_encode_query_in_context', lambda app, query_text: (None, None))
+    monkeypatch.setattr(service, 'get_client', lambda: None)
+    monkeypatch.setattr(service, 'search_many', lambda project_id, requests: [[] for _ in requests])
+    query = f"cache scope {uuid.uuid4()}"
+    first, other = _CountingProvider(), _OtherProvider()
+
+    service.search_similar(1, query, ai_service=first)
+    service.search_similar(1, query, ai_service=other)
+    service.search_similar(1, query, ai_service=first)
+
+    assert first.calls == 1
+    assert other.calls == 1
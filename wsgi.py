@@ -4,6 +4,19 @@ from app import create_app, db
 
 app = create_app()
 
+if app.config.get('QDRANT_PREFER_GRPC'):
+    # grpcio's C core blocks the gevent hub unless told to use gevent's I/O;
+    # this must run before the first Qdrant client (and its channel) is built.
+    try:
+        from gevent import monkey
+
+        if monkey.is_module_patched('socket'):
+            from grpc.experimental import gevent as grpc_gevent
+
+            grpc_gevent.init_gevent()
+    except ImportError:
+        pass
+
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()